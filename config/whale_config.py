@@ -4,7 +4,9 @@ BIO Whale Monitor Configuration
 Конфигурация для мониторинга крупных исходящих транзакций BIO и vBIO токенов
 """
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Dict, List
 
 # BIO и vBIO токены на Ethereum
 BIO_TOKENS = {
@@ -96,9 +98,17 @@ MONITORED_WALLETS = [
 # Настройки мониторинга
 MONITORING_CONFIG = {
     "check_interval": 30,  # Интервал проверки в секундах
+    # Предел интервала при адаптивном замедлении в тихие периоды. Равен check_interval - замедление
+    # выключено. Больше значение - меньше RPC запросов, но алерт может прийти с задержкой до этого предела
+    "max_check_interval": 30,
     "blocks_lookback": 5,  # Количество блоков для проверки назад
     "retry_attempts": 3,
     "retry_delay": 5,
+    "rpc_requests_per_second": 10,  # Средняя частота запросов к Ethereum RPC
+    "rpc_burst": 10,  # Допустимый всплеск запросов к RPC
+    "rpc_hedge_delay": 0.5,  # Секунд ожидания основного RPC до дублирования запроса на резервный
+    "rpc_failure_threshold": 5,  # Ошибок RPC подряд до размыкания circuit breaker
+    "rpc_recovery_timeout": 30,  # Секунд до пробного запроса после размыкания
 }
 
 def print_whale_monitoring_summary():
@@ -147,6 +157,14 @@ def print_whale_monitoring_summary():
     
     print("="*80)
 
+@cache
+def get_token_keys_by_address() -> Dict[str, str]:
+    """Адрес контракта (lowercase) -> ключ токена из BIO_TOKENS (конфигурация статична, поэтому кэшируется)"""
+    return {
+        token_info['contract_address'].lower(): token_key
+        for token_key, token_info in BIO_TOKENS.items()
+    }
+
 def validate_wallet_address(address: str) -> bool:
     """Валидация Ethereum адреса или ENS домена"""
     # Проверка ENS домена
@@ -195,6 +213,9 @@ def resolve_ens_domain(ens_domain: str, web3_instance) -> str:
         print(f"❌ Failed to resolve ENS domain {ens_domain}: {e}")
         return ""
 
+# Число одновременных ENS запросов (каждое разрешение - несколько RPC вызовов)
+ENS_RESOLUTION_WORKERS = 8
+
 def get_resolved_wallet_addresses(web3_instance=None) -> List[str]:
     """
     Получает список всех кошельков с разрешенными ENS доменами
@@ -206,20 +227,27 @@ def get_resolved_wallet_addresses(web3_instance=None) -> List[str]:
         Список Ethereum адресов (ENS домены разрешены в адреса)
     """
     resolved_addresses = []
+    ens_domains = []
     
     for wallet in MONITORED_WALLETS:
         if is_ens_domain(wallet):
             if web3_instance:
-                resolved_address = resolve_ens_domain(wallet, web3_instance)
-                if resolved_address:
-                    resolved_addresses.append(resolved_address.lower())
-                else:
-                    print(f"⚠️  Failed to resolve ENS domain: {wallet}")
+                ens_domains.append(wallet)
             else:
                 print(f"⚠️  Web3 instance required to resolve ENS domain: {wallet}")
         else:
             resolved_addresses.append(wallet.lower())
     
+    # ENS домены независимы: разрешаем их параллельно, а не по одному RPC циклу на домен
+    if ens_domains:
+        with ThreadPoolExecutor(max_workers=min(ENS_RESOLUTION_WORKERS, len(ens_domains))) as executor:
+            results = executor.map(lambda domain: resolve_ens_domain(domain, web3_instance), ens_domains)
+            for wallet, resolved_address in zip(ens_domains, results):
+                if resolved_address:
+                    resolved_addresses.append(resolved_address.lower())
+                else:
+                    print(f"⚠️  Failed to resolve ENS domain: {wallet}")
+    
     # Удаляем дубликаты
     return list(set(resolved_addresses))
 
@@ -14,6 +14,14 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+TREASURY_TRANSACTION_INSERT_SQL = """
+    INSERT OR REPLACE INTO treasury_transactions 
+    (tx_hash, timestamp, dao_name, blockchain, from_address, to_address, 
+     token_address, token_symbol, amount, amount_usd, tx_type, 
+     alert_triggered, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 class DAOTreasuryDatabase:
     """Класс для работы с базой данных мониторинга DAO"""
     
@@ -21,12 +29,21 @@ class DAOTreasuryDatabase:
         self.db_path = db_path
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Открытие соединения с SQLite (в режиме WAL synchronous=NORMAL безопасен и коммиты дешевле)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
+            # WAL журнал: дешевые коммиты и чтение без блокировки писателей
+            cursor.execute("PRAGMA journal_mode=WAL")
+            
             # Таблица для транзакций treasury
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS treasury_transactions (
@@ -161,33 +178,32 @@ class DAOTreasuryDatabase:
             logger.error(f"Error initializing database: {e}")
             raise
     
+    @staticmethod
+    def _treasury_transaction_row(tx_data: Dict[str, Any]) -> tuple:
+        """Преобразование транзакции treasury в строку для INSERT"""
+        return (
+            tx_data['tx_hash'],
+            tx_data['timestamp'],
+            tx_data['dao_name'],
+            tx_data['blockchain'],
+            tx_data['from_address'],
+            tx_data['to_address'],
+            tx_data['token_address'],
+            tx_data['token_symbol'],
+            float(tx_data['amount']),
+            float(tx_data['amount_usd']),
+            tx_data['tx_type'],
+            tx_data.get('alert_triggered', False),
+            json.dumps(tx_data.get('metadata', {}))
+        )
+    
     def save_treasury_transaction(self, tx_data: Dict[str, Any]) -> bool:
         """Сохранение транзакции treasury"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT OR REPLACE INTO treasury_transactions 
-                (tx_hash, timestamp, dao_name, blockchain, from_address, to_address, 
-                 token_address, token_symbol, amount, amount_usd, tx_type, 
-                 alert_triggered, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                tx_data['tx_hash'],
-                tx_data['timestamp'],
-                tx_data['dao_name'],
-                tx_data['blockchain'],
-                tx_data['from_address'],
-                tx_data['to_address'],
-                tx_data['token_address'],
-                tx_data['token_symbol'],
-                float(tx_data['amount']),
-                float(tx_data['amount_usd']),
-                tx_data['tx_type'],
-                tx_data.get('alert_triggered', False),
-                json.dumps(tx_data.get('metadata', {}))
-            ))
+            cursor.execute(TREASURY_TRANSACTION_INSERT_SQL, self._treasury_transaction_row(tx_data))
             
             conn.commit()
             conn.close()
@@ -199,10 +215,36 @@ class DAOTreasuryDatabase:
             logger.error(f"Error saving treasury transaction: {e}")
             return False
     
+    def save_treasury_transactions(self, transactions: List[Dict[str, Any]]) -> bool:
+        """Сохранение пачки транзакций treasury одной транзакцией"""
+        if not transactions:
+            return True
+        
+        try:
+            # Одна строка на tx_hash: повторы внутри пачки все равно перезаписали бы друг друга
+            rows = list({
+                tx_data['tx_hash']: self._treasury_transaction_row(tx_data) for tx_data in transactions
+            }.values())
+            
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            cursor.executemany(TREASURY_TRANSACTION_INSERT_SQL, rows)
+            
+            conn.commit()
+            conn.close()
+            
+            logger.info(f"Saved {len(rows)} treasury transactions in batch")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving treasury transactions batch: {e}")
+            return False
+    
     def save_pool_activity(self, activity_data: Dict[str, Any]) -> bool:
         """Сохранение активности в пуле"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -242,7 +284,7 @@ class DAOTreasuryDatabase:
     def save_balance_snapshot(self, balance_data: Dict[str, Any]) -> bool:
         """Сохранение снимка баланса treasury"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -274,7 +316,7 @@ class DAOTreasuryDatabase:
     def save_alert(self, alert_data: Dict[str, Any]) -> bool:
         """Сохранение алерта"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -306,7 +348,7 @@ class DAOTreasuryDatabase:
     def get_recent_transactions(self, dao_name: Optional[str] = None, hours: int = 24) -> List[Dict[str, Any]]:
         """Получение недавних транзакций"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -343,7 +385,7 @@ class DAOTreasuryDatabase:
             start_time = datetime.combine(date, datetime.min.time())
             end_time = datetime.combine(date, datetime.max.time())
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Статистика по treasury транзакциям
@@ -402,7 +444,7 @@ class DAOTreasuryDatabase:
     def is_transaction_processed(self, tx_hash: str) -> bool:
         """Проверка, была ли транзакция уже обработана"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -421,7 +463,7 @@ class DAOTreasuryDatabase:
     def is_alert_sent_for_transaction(self, tx_hash: str) -> bool:
         """Проверка, был ли уже отправлен алерт для данной транзакции"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -441,7 +483,7 @@ class DAOTreasuryDatabase:
     def get_database_stats(self) -> Dict[str, Any]:
         """Получение статистики базы данных"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Подсчет записей в таблицах
@@ -478,7 +520,7 @@ class DAOTreasuryDatabase:
     def get_recent_alerts(self, hours: int = 24, limit: int = 100) -> List[Dict[str, Any]]:
         """Получение последних алертов"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -516,7 +558,7 @@ class DAOTreasuryDatabase:
     def save_token_price(self, price_data: Dict[str, Any]) -> bool:
         """Сохранение цены токена"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -550,7 +592,7 @@ class DAOTreasuryDatabase:
     def get_latest_token_price(self, token_address: str) -> Optional[Dict[str, Any]]:
         """Получение последней цены токена"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -583,7 +625,7 @@ class DAOTreasuryDatabase:
     def get_token_price_history(self, token_address: str, hours: int = 24) -> List[Dict[str, Any]]:
         """Получение истории цен токена за период"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -616,37 +658,29 @@ class DAOTreasuryDatabase:
     def get_price_change_percentage(self, token_address: str, hours: int = 1) -> Optional[float]:
         """Вычисление процентного изменения цены за период"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            # Получаем последнюю цену
-            cursor.execute("""
-                SELECT price_usd FROM token_prices 
-                WHERE token_address = ?
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (token_address,))
-            
-            current_row = cursor.fetchone()
-            if not current_row:
-                return None
-            
-            current_price = float(current_row[0])
-            
-            # Получаем цену N часов назад
+            # Последняя цена и цена N часов назад одним запросом
             cursor.execute("""
-                SELECT price_usd FROM token_prices 
-                WHERE token_address = ? 
-                AND timestamp <= datetime('now', '-{} hours')
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """.format(hours), (token_address,))
-            
-            past_row = cursor.fetchone()
-            if not past_row:
+                SELECT
+                    (SELECT price_usd FROM token_prices 
+                     WHERE token_address = ?
+                     ORDER BY timestamp DESC 
+                     LIMIT 1),
+                    (SELECT price_usd FROM token_prices 
+                     WHERE token_address = ? 
+                     AND timestamp <= datetime('now', ?)
+                     ORDER BY timestamp DESC 
+                     LIMIT 1)
+            """, (token_address, token_address, f'-{int(hours)} hours'))
+            
+            current_price, past_price = cursor.fetchone()
+            if current_price is None or past_price is None:
                 return None
             
-            past_price = float(past_row[0])
+            current_price = float(current_price)
+            past_price = float(past_price)
             
             if past_price == 0:
                 return None
@@ -665,7 +699,7 @@ class DAOTreasuryDatabase:
     def cleanup_old_prices(self, days: int = 30):
         """Удаление старых записей цен (старше N дней)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
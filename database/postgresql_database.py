@@ -12,11 +12,26 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from decimal import Decimal
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from psycopg2 import pool
 
 logger = logging.getLogger(__name__)
 
+# Строк в одном multi-row INSERT при execute_values
+INSERT_PAGE_SIZE = 500
+
+# VALUES %s раскрывается execute_values в список строк: один INSERT на страницу вместо запроса на строку
+TREASURY_TRANSACTION_INSERT_SQL = """
+    INSERT INTO treasury_transactions 
+    (tx_hash, timestamp, dao_name, blockchain, from_address, to_address, 
+     token_address, token_symbol, amount, amount_usd, tx_type, 
+     alert_triggered, metadata)
+    VALUES %s
+    ON CONFLICT (tx_hash) DO UPDATE SET
+    amount_usd = EXCLUDED.amount_usd,
+    alert_triggered = EXCLUDED.alert_triggered
+"""
+
 class PostgreSQLDatabase:
     """Класс для работы с PostgreSQL базой данных на Railway"""
     
@@ -195,6 +210,25 @@ class PostgreSQLDatabase:
             if conn:
                 self.put_connection(conn)
     
+    @staticmethod
+    def _treasury_transaction_row(tx_data: Dict[str, Any]) -> tuple:
+        """Преобразование транзакции treasury в строку для INSERT"""
+        return (
+            tx_data['tx_hash'],
+            tx_data['timestamp'],
+            tx_data['dao_name'],
+            tx_data['blockchain'],
+            tx_data['from_address'],
+            tx_data['to_address'],
+            tx_data['token_address'],
+            tx_data['token_symbol'],
+            float(tx_data['amount']),
+            float(tx_data['amount_usd']),
+            tx_data['tx_type'],
+            tx_data.get('alert_triggered', False),
+            json.dumps(tx_data.get('metadata', {}))
+        )
+    
     def save_treasury_transaction(self, tx_data: Dict[str, Any]) -> bool:
         """Сохранение транзакции treasury"""
         conn = None
@@ -202,30 +236,7 @@ class PostgreSQLDatabase:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO treasury_transactions 
-                (tx_hash, timestamp, dao_name, blockchain, from_address, to_address, 
-                 token_address, token_symbol, amount, amount_usd, tx_type, 
-                 alert_triggered, metadata)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (tx_hash) DO UPDATE SET
-                amount_usd = EXCLUDED.amount_usd,
-                alert_triggered = EXCLUDED.alert_triggered
-            """, (
-                tx_data['tx_hash'],
-                tx_data['timestamp'],
-                tx_data['dao_name'],
-                tx_data['blockchain'],
-                tx_data['from_address'],
-                tx_data['to_address'],
-                tx_data['token_address'],
-                tx_data['token_symbol'],
-                float(tx_data['amount']),
-                float(tx_data['amount_usd']),
-                tx_data['tx_type'],
-                tx_data.get('alert_triggered', False),
-                json.dumps(tx_data.get('metadata', {}))
-            ))
+            execute_values(cursor, TREASURY_TRANSACTION_INSERT_SQL, [self._treasury_transaction_row(tx_data)])
             
             conn.commit()
             logger.info(f"Saved treasury transaction: {tx_data['tx_hash']} - {tx_data['dao_name']} - ${tx_data['amount_usd']:.2f}")
@@ -240,6 +251,36 @@ class PostgreSQLDatabase:
             if conn:
                 self.put_connection(conn)
     
+    def save_treasury_transactions(self, transactions: List[Dict[str, Any]]) -> bool:
+        """Сохранение пачки транзакций treasury одной транзакцией"""
+        if not transactions:
+            return True
+        
+        conn = None
+        try:
+            # Одна строка на tx_hash: повторы внутри пачки все равно перезаписали бы друг друга
+            rows = list({
+                tx_data['tx_hash']: self._treasury_transaction_row(tx_data) for tx_data in transactions
+            }.values())
+            
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            execute_values(cursor, TREASURY_TRANSACTION_INSERT_SQL, rows, page_size=INSERT_PAGE_SIZE)
+            
+            conn.commit()
+            logger.info(f"Saved {len(rows)} treasury transactions in batch")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving treasury transactions batch: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                self.put_connection(conn)
+    
     def save_alert(self, alert_data: Dict[str, Any]) -> bool:
         """Сохранение алерта"""
         conn = None
@@ -465,18 +506,23 @@ class PostgreSQLDatabase:
                 LIMIT 1
             """, (token_address,))
             
+            # Пул создан с RealDictCursor: строки - словари по именам колонок
             row = cursor.fetchone()
             if row:
+                # JSONB psycopg2 уже возвращает как dict
+                metadata = row['metadata']
+                if isinstance(metadata, str):
+                    metadata = json.loads(metadata)
                 price_data = {
-                    'token_address': row[0],
-                    'token_symbol': row[1],
-                    'blockchain': row[2],
-                    'price_usd': float(row[3]),
-                    'timestamp': row[4],
-                    'market_cap_usd': row[5],
-                    'volume_24h_usd': row[6],
-                    'price_change_24h': row[7],
-                    'metadata': json.loads(row[8]) if row[8] else {}
+                    'token_address': row['token_address'],
+                    'token_symbol': row['token_symbol'],
+                    'blockchain': row['blockchain'],
+                    'price_usd': float(row['price_usd']),
+                    'timestamp': row['timestamp'],
+                    'market_cap_usd': row['market_cap_usd'],
+                    'volume_24h_usd': row['volume_24h_usd'],
+                    'price_change_24h': row['price_change_24h'],
+                    'metadata': metadata or {}
                 }
                 return price_data
             
@@ -539,35 +585,27 @@ class PostgreSQLDatabase:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Получаем последнюю цену
-            cursor.execute("""
-                SELECT price_usd FROM token_prices 
-                WHERE token_address = %s
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (token_address,))
-            
-            current_row = cursor.fetchone()
-            if not current_row:
-                return None
-            
-            current_price = float(current_row[0])
-            
-            # Получаем цену N часов назад
+            # Последняя цена и цена N часов назад одним запросом
             past_time = datetime.now() - timedelta(hours=hours)
             cursor.execute("""
-                SELECT price_usd FROM token_prices 
-                WHERE token_address = %s 
-                AND timestamp <= %s
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (token_address, past_time))
+                SELECT
+                    (SELECT price_usd FROM token_prices 
+                     WHERE token_address = %s
+                     ORDER BY timestamp DESC 
+                     LIMIT 1) AS current_price,
+                    (SELECT price_usd FROM token_prices 
+                     WHERE token_address = %s 
+                     AND timestamp <= %s
+                     ORDER BY timestamp DESC 
+                     LIMIT 1) AS past_price
+            """, (token_address, token_address, past_time))
             
-            past_row = cursor.fetchone()
-            if not past_row:
+            row = cursor.fetchone()
+            if row['current_price'] is None or row['past_price'] is None:
                 return None
             
-            past_price = float(past_row[0])
+            current_price = float(row['current_price'])
+            past_price = float(row['past_price'])
             
             if past_price == 0:
                 return None
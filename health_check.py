@@ -136,8 +136,8 @@ class HealthCheckServer:
             if not self.database:
                 self.database = DAOTreasuryDatabase()
             
-            # Простой запрос для проверки доступности
-            stats = self.database.get_database_stats()
+            # Простой запрос для проверки доступности (синхронный драйвер - в отдельном потоке)
+            stats = await asyncio.to_thread(self.database.get_database_stats)
             
             return {
                 'status': 'ok',
@@ -237,8 +237,10 @@ class HealthCheckServer:
         if not self.database:
             self.database = DAOTreasuryDatabase()
         
-        stats = self.database.get_database_stats()
-        recent_alerts = self.database.get_recent_alerts(hours=24, limit=10)
+        stats, recent_alerts = await asyncio.gather(
+            asyncio.to_thread(self.database.get_database_stats),
+            asyncio.to_thread(self.database.get_recent_alerts, hours=24, limit=10)
+        )
         
         return {
             'system': {
@@ -259,7 +261,7 @@ class HealthCheckServer:
         if not self.database:
             self.database = DAOTreasuryDatabase()
         
-        stats = self.database.get_database_stats()
+        stats = await asyncio.to_thread(self.database.get_database_stats)
         
         return {
             'treasury_transactions_total': stats.get('treasury_transactions', 0),
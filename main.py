@@ -24,11 +24,12 @@ except ImportError:
 # Добавляем текущую директорию в путь для импортов
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config.whale_config import print_whale_monitoring_summary, MONITORED_WALLETS
+from config.whale_config import print_whale_monitoring_summary, MONITORED_WALLETS, MONITORING_CONFIG
 from database.database import DAOTreasuryDatabase
 from monitors.bio_whale_monitor import BIOWhaleMonitor
 from notifications.notification_system import NotificationSystem, init_notification_system
 from health_check import get_health_server
+from utils.price_utils import close_http_client
 
 # Добавляем PostgreSQL поддержку для Railway
 try:
@@ -103,6 +104,10 @@ def get_ethereum_rpc_url() -> Optional[str]:
     """Получение Ethereum RPC URL"""
     return os.getenv('ETHEREUM_RPC_URL')
 
+def get_ethereum_fallback_rpc_url() -> Optional[str]:
+    """Получение резервного Ethereum RPC URL (опционально)"""
+    return os.getenv('ETHEREUM_RPC_URL_FALLBACK')
+
 class BIOWhaleMonitorApp:
     """Основное приложение BIO Whale Monitor"""
     
@@ -159,7 +164,8 @@ class BIOWhaleMonitorApp:
                     self.whale_monitor = BIOWhaleMonitor(
                         self.ethereum_rpc_url, 
                         self.database, 
-                        self.notification_system
+                        self.notification_system,
+                        fallback_rpc_url=get_ethereum_fallback_rpc_url()
                     )
                     self.logger.info("✅ BIO Whale monitor initialized successfully")
                 except Exception as e:
@@ -196,8 +202,8 @@ class BIOWhaleMonitorApp:
             whale_status = "✅ Active" if self.whale_monitor else "❌ Disabled"
             wallets_count = len(MONITORED_WALLETS)
             
-            # Статистика базы данных
-            stats = self.database.get_database_stats()
+            # Статистика базы данных (синхронный запрос не блокирует event loop)
+            stats = await asyncio.to_thread(self.database.get_database_stats)
             
             message = f"""🚀 **BIO Whale Monitor Deployed Successfully**
 
@@ -369,9 +375,11 @@ class BIOWhaleMonitorApp:
                 self.logger.info("✅ Whale monitoring cycle completed")
                 
                 # Ожидание между циклами (настраивается в конфиге)
-                from config.whale_config import MONITORING_CONFIG
-                check_interval = MONITORING_CONFIG['check_interval']
-                self.logger.info(f"⏰ Waiting {check_interval} seconds until next whale check")
+                if self.whale_monitor:
+                    check_interval = self.whale_monitor.effective_interval
+                else:
+                    check_interval = MONITORING_CONFIG['check_interval']
+                self.logger.info("⏰ Waiting %s seconds until next whale check", check_interval)
                 await asyncio.sleep(check_interval)
                 
             except Exception as e:
@@ -542,8 +550,7 @@ class BIOWhaleMonitorApp:
         
         # Остановка мониторов
         if self.whale_monitor:
-            # Whale monitor не требует специальной очистки
-            pass
+            self.whale_monitor.close()
         
         # Закрытие базы данных
         if self.database:
@@ -589,6 +596,10 @@ class BIOWhaleMonitorApp:
             self.logger.error(f"Fatal error: {e}")
             raise
         finally:
+            # Общий HTTP клиент и async RPC сессия живут всё время работы приложения и закрываются только здесь
+            if self.whale_monitor:
+                await self.whale_monitor.close_async()
+            await close_http_client()
             self.finalize_shutdown()
 
 def load_config():
@@ -7,11 +7,14 @@ BIO Whale Monitor
 import asyncio
 import logging
 import time
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
 from datetime import datetime, timezone
-from web3 import Web3
-from web3.contract import Contract
-import json
+from decimal import Decimal, ROUND_CEILING
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
 
 from config.whale_config import (
     BIO_TOKENS, 
@@ -19,11 +22,39 @@ from config.whale_config import (
     MONITORED_WALLETS,
     MONITORING_CONFIG,
     get_resolved_wallet_addresses,
+    get_token_keys_by_address,
     is_ens_domain
 )
-from utils.price_utils import get_bio_token_price, format_price
+from utils.price_utils import get_token_price_coingecko, get_http_client, format_price
+from utils.rate_limiter import AsyncTokenBucket
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from notifications.notification_system import NotificationSystem
 
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_EVENT_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Ограничения eth_getLogs: размер одного диапазона (чтобы RPC не отвечал timeout),
+# число диапазонов за цикл и число одновременных запросов к RPC
+MAX_BLOCK_RANGE = 100
+MAX_BLOCK_RANGES_PER_SCAN = 10
+MAX_CONCURRENT_LOG_REQUESTS = 4
+
+# Время жизни кэша цен токенов (секунды)
+PRICE_CACHE_TTL = 300
+
+# Сколько последних хэшей проверенных транзакций помнить между циклами
+SEEN_TX_HASHES_LIMIT = 10_000
+
+# Сколько последних timestamp блоков хранить в кэше
+BLOCK_TIMESTAMP_CACHE_SIZE = 1_000
+
+# Одновременных отправок в Telegram (Bot API ограничивает частоту сообщений в чат)
+MAX_CONCURRENT_ALERTS = 5
+
+def address_to_topic(address: str) -> str:
+    """Преобразование адреса в 32-байтный topic для фильтра логов"""
+    return "0x" + address.lower()[2:].rjust(64, "0")
+
 # ERC-20 Token ABI (минимальный набор для чтения трансферов)
 ERC20_ABI = [
     {
@@ -59,14 +90,20 @@ ERC20_ABI = [
 class BIOWhaleMonitor:
     """Мониторинг крупных исходящих транзакций BIO и vBIO токенов"""
     
-    def __init__(self, ethereum_rpc_url: str, database, notification_system: NotificationSystem):
+    def __init__(self, ethereum_rpc_url: str, database, notification_system: NotificationSystem,
+                 fallback_rpc_url: Optional[str] = None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.database = database
         self.notification_system = notification_system
         
-        # Инициализация Web3
+        # Инициализация Web3 с общей requests сессией: keep-alive соединения к RPC
+        # живут всё время работы монитора, а не пересоздаются между циклами
+        self.rpc_session = requests.Session()
+        rpc_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=20)
+        self.rpc_session.mount('https://', rpc_adapter)
+        self.rpc_session.mount('http://', rpc_adapter)
         try:
-            self.w3 = Web3(Web3.HTTPProvider(ethereum_rpc_url))
+            self.w3 = Web3(Web3.HTTPProvider(ethereum_rpc_url, session=self.rpc_session))
             if not self.w3.is_connected():
                 raise Exception("Cannot connect to Ethereum RPC")
             self.logger.info(f"✅ Connected to Ethereum RPC: {ethereum_rpc_url[:50]}...")
@@ -74,20 +111,80 @@ class BIOWhaleMonitor:
             self.logger.error(f"❌ Failed to connect to Ethereum RPC: {e}")
             raise
         
+        # Асинхронный клиент для горячего пути (block_number, get_logs): не блокирует event loop.
+        # Синхронный self.w3 остается для однократной настройки (проверка соединения, ENS)
+        self.async_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(ethereum_rpc_url))
+        self.rpc_async_session: Optional[aiohttp.ClientSession] = None
+        
+        # Резервный RPC (опционально): запросы хеджируются, если основной не ответил вовремя
+        self.fallback_async_w3 = None
+        if fallback_rpc_url:
+            self.fallback_async_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(fallback_rpc_url))
+            self.logger.info(f"🛡️ Hedging RPC requests with fallback: {fallback_rpc_url[:50]}...")
+        self.rpc_hedge_delay = MONITORING_CONFIG['rpc_hedge_delay']
+        self.rpc_wins = {'primary': 0, 'fallback': 0}
+        
+        # При серии ошибок RPC (429/5xx, таймауты) запросы временно не отправляются
+        self.rpc_breaker = CircuitBreaker(
+            'ethereum_rpc',
+            failure_threshold=MONITORING_CONFIG['rpc_failure_threshold'],
+            recovery_timeout=MONITORING_CONFIG['rpc_recovery_timeout']
+        )
+        
+        # Семафор ограничивает одновременные запросы, token bucket - их частоту (защита от 429)
+        self.rpc_limiter = AsyncTokenBucket(
+            MONITORING_CONFIG['rpc_requests_per_second'], MONITORING_CONFIG['rpc_burst']
+        )
+        
         # Инициализация контрактов токенов
         self.token_contracts = {}
         self._initialize_token_contracts()
         
+        # Checksum адреса контрактов для фильтра логов считаем один раз
+        self.token_addresses = [
+            token_data['contract'].address for token_data in self.token_contracts.values()
+        ]
+        
         # Разрешение ENS доменов в адреса
         self.monitored_addresses = []
+        self.monitored_address_set = frozenset()
+        self.wallet_topics = []
         self._resolve_wallet_addresses()
         
+        # USD порог whale транзакций приводим к float один раз, а не на каждом событии
+        self.usd_threshold = float(WHALE_THRESHOLDS['usd_amount'])
+        
+        # Делители 10 ** decimals для перевода сырых сумм в токены
+        self.token_divisors = {
+            token_key: 10 ** token_info['decimals'] for token_key, token_info in BIO_TOKENS.items()
+        }
+        # Порог по количеству токенов в сырых единицах: на каждом событии сравниваем int с int
+        self.raw_token_thresholds = {
+            token_key: int(
+                (Decimal(str(WHALE_THRESHOLDS['token_amount'])) * divisor).to_integral_value(rounding=ROUND_CEILING)
+            )
+            for token_key, divisor in self.token_divisors.items()
+        }
+        
+        # Хэши уже проверенных транзакций (LRU): повторно не проверяем и не шлем алерты
+        self.seen_tx_hashes: OrderedDict = OrderedDict()
+        
+        # Timestamp блоков (LRU): несколько whale транзакций одного блока - один запрос get_block
+        self.block_timestamps: OrderedDict = OrderedDict()
+        
         # Кэш для хранения последних обработанных блоков
         self.last_processed_blocks = {}
         
+        # Число циклов подряд без трансферов с отслеживаемых кошельков (для адаптивного интервала)
+        self.idle_streak = 0
+        
         # Кэш цен токенов (обновляется каждые 5 минут)
         self.price_cache = {}
-        self.last_price_update = 0
+        # Время последнего обновления по time.monotonic() (не зависит от коррекции системных часов)
+        self.last_price_update: Optional[float] = None
+        # Одновременные вызовы ждут одно обновление цены вместо дублирующих запросов к CoinGecko
+        self._price_lock = asyncio.Lock()
+        self._load_saved_prices()
     
     def _initialize_token_contracts(self):
         """Инициализация контрактов BIO токенов"""
@@ -114,6 +211,14 @@ class BIOWhaleMonitor:
         
         if resolved_addresses:
             self.monitored_addresses = [addr.lower() for addr in resolved_addresses]
+            # Множество для O(1) проверки отправителя на каждом событии
+            self.monitored_address_set = frozenset(self.monitored_addresses)
+            # Topics кошельков для фильтра eth_getLogs не меняются между циклами
+            self.wallet_topics = [address_to_topic(address) for address in self.monitored_addresses]
+            # Checksum адреса кошельков (keccak) считаем один раз, а не на каждом событии
+            self.checksum_addresses = {
+                address: Web3.to_checksum_address(address) for address in self.monitored_addresses
+            }
             self.logger.info(f"✅ Resolved {len(self.monitored_addresses)} wallet addresses for monitoring")
             
             # Показываем статистику
@@ -129,27 +234,94 @@ class BIOWhaleMonitor:
         else:
             self.logger.warning("⚠️  No wallet addresses resolved!")
             self.monitored_addresses = []
+            self.monitored_address_set = frozenset()
+            self.wallet_topics = []
+            self.checksum_addresses = {}
     
-    async def _update_token_prices(self):
-        """Обновление кэша цен токенов"""
-        current_time = time.time()
-        if current_time - self.last_price_update < 300:  # 5 минут
-            return
-        
+    def _load_saved_prices(self):
+        """Загрузка последней сохраненной цены BIO из базы, чтобы после перезапуска не ходить в CoinGecko"""
         try:
-            self.logger.info("💰 Updating token prices...")
+            latest_price = self.database.get_latest_token_price(BIO_TOKENS['BIO']['contract_address'])
+            if not latest_price:
+                return
             
-            # Получаем цену BIO токена
-            bio_price = get_bio_token_price('ethereum')
-            if bio_price:
-                self.price_cache['BIO'] = bio_price
-                self.price_cache['vBIO'] = bio_price  # Предполагаем что vBIO = BIO
-                self.logger.info(f"💰 Updated BIO price: ${format_price(bio_price)}")
+            timestamp = latest_price['timestamp']
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            price_age = (datetime.now(timezone.utc) - timestamp).total_seconds()
+            
+            # Устаревшую цену не используем: лучше запросить актуальную
+            if price_age >= PRICE_CACHE_TTL:
+                return
             
-            self.last_price_update = current_time
+            bio_price_usd = float(latest_price['price_usd'])
+            self.price_cache['BIO'] = bio_price_usd
+            self.price_cache['vBIO'] = bio_price_usd
+            self.last_price_update = time.monotonic() - max(price_age, 0)
+            self.logger.info(f"💰 Loaded saved BIO price: ${bio_price_usd} ({price_age:.0f}s old)")
             
         except Exception as e:
-            self.logger.error(f"❌ Failed to update token prices: {e}")
+            self.logger.warning(f"⚠️ Failed to load saved token prices: {e}")
+    
+    def _save_price(self, price_usd: float):
+        """Сохранение цены BIO в базу для теплого старта после перезапуска"""
+        try:
+            self.database.save_token_price({
+                'token_address': BIO_TOKENS['BIO']['contract_address'],
+                'token_symbol': BIO_TOKENS['BIO']['symbol'],
+                'blockchain': 'ethereum',
+                'price_usd': price_usd,
+                'timestamp': datetime.now(timezone.utc)
+            })
+        except Exception as e:
+            self.logger.warning(f"⚠️ Failed to save BIO price: {e}")
+    
+    def _remember_tx_hash(self, tx_hash: str):
+        """Запоминание проверенной транзакции с вытеснением самых старых"""
+        self.seen_tx_hashes[tx_hash] = None
+        self.seen_tx_hashes.move_to_end(tx_hash)
+        if len(self.seen_tx_hashes) > SEEN_TX_HASHES_LIMIT:
+            self.seen_tx_hashes.popitem(last=False)
+    
+    def _prices_are_fresh(self) -> bool:
+        """Проверка, что кэш цен моложе PRICE_CACHE_TTL"""
+        return (
+            self.last_price_update is not None
+            and time.monotonic() - self.last_price_update < PRICE_CACHE_TTL
+        )
+    
+    async def _update_token_prices(self):
+        """Обновление кэша цен токенов"""
+        if self._prices_are_fresh():
+            return
+        
+        async with self._price_lock:
+            # Пока ждали блокировку, цену мог уже обновить другой вызов
+            if self._prices_are_fresh():
+                return
+            
+            try:
+                self.logger.info("💰 Updating token prices...")
+                
+                # Получаем цену BIO токена асинхронно, не блокируя event loop
+                bio_price = await get_token_price_coingecko(
+                    BIO_TOKENS['BIO']['contract_address'], 'ethereum', get_http_client()
+                )
+                if bio_price:
+                    # Приводим Decimal к float один раз: на каждом событии цена умножается на float количество токенов
+                    bio_price_usd = float(bio_price)
+                    self.price_cache['BIO'] = bio_price_usd
+                    self.price_cache['vBIO'] = bio_price_usd  # Предполагаем что vBIO = BIO
+                    self.logger.info(f"💰 Updated BIO price: ${format_price(bio_price)}")
+                    # Синхронный драйвер БД - в пуле потоков, чтобы не блокировать event loop
+                    await asyncio.to_thread(self._save_price, bio_price_usd)
+                
+                self.last_price_update = time.monotonic()
+                
+            except Exception as e:
+                self.logger.error(f"❌ Failed to update token prices: {e}")
     
     def _calculate_usd_value(self, token_symbol: str, token_amount: float) -> float:
         """Расчет USD стоимости токенов"""
@@ -157,109 +329,121 @@ class BIOWhaleMonitor:
             return token_amount * self.price_cache[token_symbol]
         return 0.0
     
-    async def _check_whale_transaction(self, token_key: str, tx_hash: str, from_address: str, 
-                                     to_address: str, amount_raw: int) -> bool:
-        """Проверка транзакции на соответствие whale критериям"""
+    def _check_whale_transaction(self, token_key: str, tx_hash: str, from_address: str, 
+                                 to_address: str, amount_raw: int, block_number: int,
+                                 detected_at: datetime) -> Optional[Dict[str, Any]]:
+        """Проверка транзакции на соответствие whale критериям.
+        Возвращает данные whale транзакции или None"""
         try:
             token_info = BIO_TOKENS[token_key]
-            decimals = token_info['decimals']
-            token_amount = amount_raw / (10 ** decimals)
+            token_amount = amount_raw / self.token_divisors[token_key]
             
             # Проверяем пороговые значения
-            meets_token_threshold = token_amount >= WHALE_THRESHOLDS['token_amount']
+            meets_token_threshold = amount_raw >= self.raw_token_thresholds[token_key]
             
             usd_value = self._calculate_usd_value(token_info['symbol'], token_amount)
-            meets_usd_threshold = usd_value >= WHALE_THRESHOLDS['usd_amount']
+            meets_usd_threshold = usd_value >= self.usd_threshold
             
             if meets_token_threshold or meets_usd_threshold:
-                self.logger.info(f"🐋 WHALE TRANSACTION DETECTED!")
-                self.logger.info(f"   Token: {token_info['symbol']}")
-                self.logger.info(f"   Amount: {token_amount:,.2f} tokens")
-                self.logger.info(f"   USD Value: ${usd_value:,.2f}")
-                self.logger.info(f"   From: {from_address}")
-                self.logger.info(f"   To: {to_address}")
-                self.logger.info(f"   TX: {tx_hash}")
-                
-                # Сохраняем в базу данных
-                await self._save_whale_transaction(
-                    tx_hash, token_key, from_address, to_address, 
-                    token_amount, usd_value
+                self.logger.info(
+                    f"🐋 WHALE TRANSACTION DETECTED!\n"
+                    f"   Token: {token_info['symbol']}\n"
+                    f"   Amount: {token_amount:,.2f} tokens\n"
+                    f"   USD Value: ${usd_value:,.2f}\n"
+                    f"   From: {from_address}\n"
+                    f"   To: {to_address}\n"
+                    f"   TX: {tx_hash}"
                 )
                 
-                # Отправляем уведомление
-                await self._send_whale_alert(
+                return self._build_whale_transaction(
                     tx_hash, token_info, from_address, to_address,
-                    token_amount, usd_value
+                    token_amount, usd_value, block_number, detected_at,
+                    meets_token_threshold, meets_usd_threshold
                 )
-                
-                return True
             
-            return False
+            return None
             
         except Exception as e:
             self.logger.error(f"❌ Error checking whale transaction: {e}")
-            return False
+            return None
     
-    async def _save_whale_transaction(self, tx_hash: str, token_key: str, 
-                                    from_address: str, to_address: str,
-                                    token_amount: float, usd_value: float):
-        """Сохранение whale транзакции в базу данных"""
-        try:
-            # Проверяем дубликаты
-            if self.database.is_duplicate_transaction(tx_hash):
-                self.logger.debug(f"⚠️ Duplicate whale transaction skipped: {tx_hash}")
-                return
-            
-            # Сохраняем транзакцию
-            transaction_data = {
-                'transaction_hash': tx_hash,
-                'from_address': from_address,
-                'to_address': to_address,
-                'token_symbol': BIO_TOKENS[token_key]['symbol'],
-                'token_amount': token_amount,
-                'usd_value': usd_value,
-                'transaction_type': 'whale_transfer',
-                'timestamp': datetime.now(timezone.utc),
-                'block_number': None  # Можно добавить позже
+    def _build_whale_transaction(self, tx_hash: str, token_info: Dict, 
+                                 from_address: str, to_address: str,
+                                 token_amount: float, usd_value: float, block_number: int,
+                                 detected_at: datetime, meets_token_threshold: bool,
+                                 meets_usd_threshold: bool) -> Dict[str, Any]:
+        """Данные whale транзакции в формате treasury_transactions (они же уходят в уведомление)"""
+        return {
+            'tx_hash': tx_hash,
+            'timestamp': detected_at,
+            'dao_name': 'BIO Whale',  # Условное имя для whale транзакций
+            'blockchain': 'ethereum',
+            'from_address': from_address,
+            'to_address': to_address,
+            'token_address': token_info['contract_address'],
+            'token_symbol': token_info['symbol'],
+            'amount': token_amount,
+            'amount_usd': usd_value,
+            'tx_type': 'outgoing',
+            'alert_triggered': True,
+            'metadata': {
+                'whale_alert': True,
+                'token_threshold': meets_token_threshold,
+                'usd_threshold': meets_usd_threshold,
+                'etherscan_url': f"https://etherscan.io/tx/{tx_hash}",
+                'contract_address': token_info['contract_address'],
+                'block_number': block_number
             }
-            
-            self.database.save_transaction(transaction_data)
-            self.logger.info(f"💾 Saved whale transaction to database: {tx_hash[:16]}...")
+        }
+    
+    async def _get_block_timestamp(self, block_number: int) -> Optional[datetime]:
+        """Получение времени блока (из кэша или одним запросом get_block)"""
+        if block_number in self.block_timestamps:
+            self.block_timestamps.move_to_end(block_number)
+            return self.block_timestamps[block_number]
+        
+        try:
+            async with self.rpc_limiter:
+                block, _ = await self._rpc_call(lambda w3: w3.eth.get_block(block_number))
+            block_time = datetime.fromtimestamp(block['timestamp'], tz=timezone.utc)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Failed to get timestamp of block {block_number}: {e}")
+            return None
+        
+        self.block_timestamps[block_number] = block_time
+        if len(self.block_timestamps) > BLOCK_TIMESTAMP_CACHE_SIZE:
+            self.block_timestamps.popitem(last=False)
+        return block_time
+    
+    async def _apply_block_timestamps(self, transactions: List[Dict[str, Any]]):
+        """Замена времени обнаружения на время блока для whale транзакций"""
+        block_numbers = list({tx['metadata']['block_number'] for tx in transactions})
+        block_times = await asyncio.gather(*(self._get_block_timestamp(bn) for bn in block_numbers))
+        times_by_block = dict(zip(block_numbers, block_times))
+        
+        for tx in transactions:
+            block_time = times_by_block.get(tx['metadata']['block_number'])
+            if block_time:
+                tx['timestamp'] = block_time
+    
+    async def _save_whale_transactions(self, transactions: List[Dict[str, Any]]):
+        """Сохранение whale транзакций скана в базу данных одной пачкой"""
+        try:
+            if await asyncio.to_thread(self.database.save_treasury_transactions, transactions):
+                self.logger.info(f"💾 Saved {len(transactions)} whale transactions to database")
+            else:
+                self.logger.warning(f"⚠️ Failed to save {len(transactions)} whale transactions")
             
         except Exception as e:
-            self.logger.error(f"❌ Failed to save whale transaction: {e}")
+            self.logger.error(f"❌ Failed to save whale transactions: {e}")
     
-    async def _send_whale_alert(self, tx_hash: str, token_info: Dict, 
-                              from_address: str, to_address: str,
-                              token_amount: float, usd_value: float):
+    async def _send_whale_alert(self, semaphore: asyncio.Semaphore, transaction_data: Dict[str, Any]):
         """Отправка уведомления о whale транзакции"""
         try:
-            # Подготавливаем данные для системы уведомлений
-            transaction_data = {
-                'tx_hash': tx_hash,
-                'timestamp': datetime.now(timezone.utc),
-                'dao_name': 'BIO Whale',  # Условное имя для whale транзакций
-                'blockchain': 'ethereum',
-                'from_address': from_address,
-                'to_address': to_address,
-                'token_address': token_info['contract_address'],
-                'token_symbol': token_info['symbol'],
-                'amount': token_amount,
-                'amount_usd': usd_value,
-                'tx_type': 'outgoing',
-                'alert_triggered': True,
-                'metadata': {
-                    'whale_alert': True,
-                    'token_threshold': token_amount >= WHALE_THRESHOLDS['token_amount'],
-                    'usd_threshold': usd_value >= WHALE_THRESHOLDS['usd_amount'],
-                    'etherscan_url': f"https://etherscan.io/tx/{tx_hash}",
-                    'contract_address': token_info['contract_address']
-                }
-            }
-            
             # Отправляем через систему уведомлений
             if self.notification_system:
-                success = await self.notification_system.send_transaction_alert(transaction_data)
+                async with semaphore:
+                    success = await self.notification_system.send_transaction_alert(transaction_data)
                 
                 if success:
                     self.logger.info(f"📨 Whale alert sent successfully to Telegram")
@@ -271,71 +455,230 @@ class BIOWhaleMonitor:
         except Exception as e:
             self.logger.error(f"❌ Failed to send whale alert: {e}")
     
-    async def _scan_token_transfers(self, token_key: str, from_block: int, to_block: int):
-        """Сканирование трансферов конкретного токена"""
+    async def _ensure_async_rpc_session(self):
+        """Создание aiohttp сессии для AsyncWeb3 (один раз, внутри работающего event loop)"""
+        if self.rpc_async_session is None or self.rpc_async_session.closed:
+            self.rpc_async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+            await self.async_w3.provider.cache_async_session(self.rpc_async_session)
+            if self.fallback_async_w3:
+                await self.fallback_async_w3.provider.cache_async_session(self.rpc_async_session)
+    
+    async def _hedged_rpc(self, call: Callable[[AsyncWeb3], Awaitable[Any]]) -> Tuple[Any, AsyncWeb3]:
+        """Хеджированный RPC вызов: если основной RPC не ответил за rpc_hedge_delay (или упал),
+        тот же запрос уходит на резервный. Возвращает первый успешный ответ и ответивший провайдер"""
+        primary = asyncio.ensure_future(call(self.async_w3))
+        tasks = [primary]
         try:
-            self.logger.info(f"🔍 Starting {token_key} scan from block {from_block} to {to_block}")
+            if self.fallback_async_w3 is None:
+                return await primary, self.async_w3
             
-            token_data = self.token_contracts[token_key]
-            contract = token_data['contract']
+            done, _ = await asyncio.wait({primary}, timeout=self.rpc_hedge_delay)
+            if done and primary.exception() is None:
+                self.rpc_wins['primary'] += 1
+                return primary.result(), self.async_w3
             
-            # Ограничиваем диапазон блоков для избежания timeout
-            max_block_range = 100
-            if to_block - from_block > max_block_range:
-                to_block = from_block + max_block_range
-                self.logger.warning(f"⚠️ Limiting block range to {max_block_range} blocks: {from_block}-{to_block}")
+            # Дублирующий запрос тоже расходует токен лимитера
+            await self.rpc_limiter.acquire()
+            fallback = asyncio.ensure_future(call(self.fallback_async_w3))
+            tasks.append(fallback)
+            providers = {primary: 'primary', fallback: 'fallback'}
+            provider_w3 = {primary: self.async_w3, fallback: self.fallback_async_w3}
+            pending = {fallback} if done else {primary, fallback}
+            error = primary.exception() if done else None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.rpc_wins[providers[task]] += 1
+                        return task.result(), provider_w3[task]
+                    error = task.exception()
+            raise error
+        finally:
+            # Незавершенные запросы больше не нужны (в том числе при отмене вызывающего
+            # во время ожидания основного RPC или токена лимитера)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _rpc_call(self, call: Callable[[AsyncWeb3], Awaitable[Any]]) -> Tuple[Any, AsyncWeb3]:
+        """Хеджированный RPC вызов через circuit breaker (CircuitOpenError, пока цепь разомкнута)"""
+        return await self.rpc_breaker.call(lambda: self._hedged_rpc(call))
+    
+    async def _get_transfer_logs(self, semaphore: asyncio.Semaphore, w3: AsyncWeb3,
+                                 from_block: int, to_block: int) -> List[Dict]:
+        """Получение Transfer логов всех BIO токенов за диапазон блоков одним eth_getLogs запросом.
+        Не хеджируется: логи запрашиваются у провайдера, вернувшего текущий блок, иначе
+        отстающий провайдер вернул бы пустые логи для еще не импортированных блоков"""
+        async with semaphore, self.rpc_limiter:
+            # Второй topic (from) фильтруется на стороне ноды: возвращаются только
+            # исходящие трансферы с отслеживаемых кошельков
+            return await self.rpc_breaker.call(lambda: w3.eth.get_logs({
+                'address': self.token_addresses,
+                'topics': [TRANSFER_EVENT_TOPIC, self.wallet_topics],
+                'fromBlock': from_block,
+                'toBlock': to_block
+            }))
+    
+    async def _scan_transfers(self, w3: AsyncWeb3, from_block: int, to_block: int) -> Optional[int]:
+        """Сканирование трансферов всех BIO токенов за диапазон блоков.
+        Возвращает последний просканированный блок или None при ошибке"""
+        try:
+            self.logger.info(f"🔍 Starting transfers scan from block {from_block} to {to_block}")
             
-            self.logger.info(f"📡 Creating Transfer filter for {token_key}...")
+            # Разбиваем диапазон на куски по MAX_BLOCK_RANGE блоков и запрашиваем их конкурентно.
+            # Остаток большого отставания будет дочитан в следующих циклах
+            block_ranges = [
+                (start, min(start + MAX_BLOCK_RANGE - 1, to_block))
+                for start in range(from_block, to_block + 1, MAX_BLOCK_RANGE)
+            ]
+            if len(block_ranges) > MAX_BLOCK_RANGES_PER_SCAN:
+                block_ranges = block_ranges[:MAX_BLOCK_RANGES_PER_SCAN]
+                self.logger.warning(f"⚠️ Limiting scan to {len(block_ranges)} ranges: {from_block}-{block_ranges[-1][1]}")
             
-            # Получаем события Transfer с timeout
-            try:
-                transfer_filter = contract.events.Transfer.create_filter(
-                    fromBlock=from_block,
-                    toBlock=to_block
-                )
-                
-                self.logger.info(f"🔍 Getting Transfer events for {token_key}...")
-                events = transfer_filter.get_all_entries()
-                self.logger.info(f"📊 Found {len(events)} Transfer events for {token_key}")
-                
-            except Exception as filter_error:
-                self.logger.error(f"❌ Error creating/getting filter for {token_key}: {filter_error}")
-                return
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_LOG_REQUESTS)
+            results = await asyncio.gather(
+                *(self._get_transfer_logs(semaphore, w3, start, end) for start, end in block_ranges),
+                return_exceptions=True
+            )
             
-            whale_count = 0
+            # Обрабатываем только непрерывный успешный префикс диапазонов, чтобы маркер
+            # последнего блока не перепрыгнул через пропущенный диапазон
+            logs = []
+            last_scanned_block = None
+            for (start, end), range_logs in zip(block_ranges, results):
+                if isinstance(range_logs, Exception):
+                    self.logger.error(f"❌ Error getting Transfer logs for blocks {start}-{end}: {range_logs}")
+                    break
+                logs.extend(range_logs)
+                last_scanned_block = end
+            
+            if last_scanned_block is None:
+                return None
+            
+            self.logger.info(f"📊 Found {len(logs)} Transfer events for {len(self.token_addresses)} tokens")
+            
+            # Адрес контракта -> ключ токена для разбора логов
+            token_keys_by_address = get_token_keys_by_address()
+            
+            whale_counts = {token_key: 0 for token_key in self.token_contracts}
             processed_count = 0
+            candidates = []
             
-            for event in events:
+            for log in logs:
                 try:
                     processed_count += 1
-                    from_address = event['args']['from']
-                    to_address = event['args']['to']
-                    amount = event['args']['value']
-                    tx_hash = event['transactionHash'].hex()
+                    token_key = token_keys_by_address.get(log['address'].lower())
+                    if token_key is None:
+                        continue
+                    
+                    # Transfer(address indexed from, address indexed to, uint256 value):
+                    # адреса - последние 20 байт topics[1]/topics[2], сумма - 32 байта data.
+                    # Разбираем вручную, без ABI декодера web3
+                    topics = log['topics']
+                    if len(topics) != 3:
+                        continue
+                    from_address = "0x" + bytes(topics[1][-20:]).hex()
                     
-                    # Проверяем только исходящие транзакции от отслеживаемых кошельков
-                    if from_address.lower() in self.monitored_addresses:
-                        self.logger.debug(f"🎯 Checking potential whale tx from monitored wallet: {from_address[:10]}...")
-                        is_whale = await self._check_whale_transaction(
-                            token_key, tx_hash, from_address, to_address, amount
-                        )
-                        if is_whale:
-                            whale_count += 1
-                            self.logger.info(f"🐋 Whale transaction detected! #{whale_count}")
+                    # Проверяем только исходящие транзакции от отслеживаемых кошельков.
+                    # Остальные поля декодируем только для подходящих событий
+                    if from_address in self.monitored_address_set:
+                        # Нулевой трансфер не проходит ни один порог (оба порога > 0)
+                        amount_raw = int.from_bytes(log['data'], 'big')
+                        if amount_raw == 0:
+                            continue
+                        
+                        tx_hash = Web3.to_hex(log['transactionHash'])
+                        if tx_hash in self.seen_tx_hashes:
+                            self.logger.debug("⏭️ Skipping already checked tx: %s", tx_hash)
+                            continue
+                        # Ленивое форматирование: строка не собирается, если DEBUG выключен
+                        self.logger.debug("🎯 Checking potential whale tx from monitored wallet: %s...", from_address[:10])
+                        candidates.append((
+                            token_key,
+                            tx_hash,
+                            self.checksum_addresses[from_address],
+                            Web3.to_checksum_address("0x" + bytes(topics[2][-20:]).hex()),
+                            amount_raw,
+                            log['blockNumber']
+                        ))
                             
                 except Exception as event_error:
-                    self.logger.error(f"❌ Error processing event {processed_count}: {event_error}")
+                    self.logger.error("❌ Error processing event %d: %s", processed_count, event_error)
                     continue
             
-            self.logger.info(f"✅ {token_key} scan completed: {processed_count} events processed, {whale_count} whales found")
+            # Тихий цикл - нет новых исходящих трансферов отслеживаемых кошельков
+            # (логи из перекрытия с прошлым сканом активностью не считаются)
+            self.idle_streak = 0 if candidates else self.idle_streak + 1
+            
+            # Цена нужна только для USD оценки кандидатов: в тихих циклах CoinGecko не запрашиваем
+            if candidates:
+                try:
+                    await self._update_token_prices()
+                except Exception as price_error:
+                    self.logger.error(f"❌ Failed to update token prices: {price_error}")
+                    # Продолжаем работу даже без актуальных цен
+            
+            # Проверяем каждый трансфер, но на транзакцию оставляем одну запись и один алерт:
+            # крупнейший прошедший порог трансфер (записи в базе уникальны по tx_hash)
+            whales_by_tx = {}
+            # Одно время обнаружения на весь скан (запасной вариант, если время блока недоступно)
+            detected_at = datetime.now(timezone.utc)
+            for candidate in candidates:
+                whale_transaction = self._check_whale_transaction(*candidate, detected_at)
+                if whale_transaction:
+                    token_key, tx_hash = candidate[0], candidate[1]
+                    previous = whales_by_tx.get(tx_hash)
+                    if previous is None or (
+                        (whale_transaction['amount_usd'], whale_transaction['amount'])
+                        > (previous[1]['amount_usd'], previous[1]['amount'])
+                    ):
+                        whales_by_tx[tx_hash] = (token_key, whale_transaction)
+            
+            # Все логи транзакции лежат в одном блоке, то есть в одном скане: после проверки
+            # всех трансферов транзакцию можно не рассматривать в следующих циклах
+            for candidate in candidates:
+                self._remember_tx_hash(candidate[1])
+            
+            whale_transactions = []
+            for token_key, whale_transaction in whales_by_tx.values():
+                whale_transactions.append(whale_transaction)
+                whale_counts[token_key] += 1
+            
+            if whale_transactions:
+                # Время транзакции - время её блока (один get_block на уникальный блок)
+                await self._apply_block_timestamps(whale_transactions)
+                
+                # Все whale транзакции скана сохраняем одним commit
+                await self._save_whale_transactions(whale_transactions)
+                
+                # Уведомления независимы: отправляем их конкурентно (не более MAX_CONCURRENT_ALERTS),
+                # чтобы медленный Telegram не растягивал цикл на N * RTT
+                alert_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ALERTS)
+                results = await asyncio.gather(
+                    *(self._send_whale_alert(alert_semaphore, tx) for tx in whale_transactions),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, Exception):
+                        self.logger.error(f"❌ Failed to send whale alert: {result}")
+            
+            total_whales = sum(whale_counts.values())
+            self.logger.info(f"✅ Transfers scan completed: {processed_count} events processed, {total_whales} whales found")
             
-            if whale_count > 0:
-                self.logger.info(f"🐋 Found {whale_count} whale transactions for {token_key}")
+            for token_key, whale_count in whale_counts.items():
+                if whale_count > 0:
+                    self.logger.info(f"🐋 Found {whale_count} whale transactions for {token_key}")
+            
+            return last_scanned_block
                 
         except Exception as e:
-            self.logger.error(f"❌ Error scanning {token_key} transfers: {e}")
+            self.logger.error(f"❌ Error scanning transfers: {e}")
             import traceback
             self.logger.error(f"Scan error traceback: {traceback.format_exc()}")
+            return None
     
     async def run_whale_monitoring_cycle(self):
         """Запуск одного цикла мониторинга whale транзакций"""
@@ -346,49 +689,75 @@ class BIOWhaleMonitor:
             
             self.logger.info("🐋 Starting whale monitoring cycle...")
             
-            # Обновляем цены токенов
-            try:
-                self.logger.info("💰 Updating token prices...")
-                await self._update_token_prices()
-                self.logger.info("✅ Token prices updated successfully")
-            except Exception as price_error:
-                self.logger.error(f"❌ Failed to update token prices: {price_error}")
-                # Продолжаем работу даже без актуальных цен
-            
             # Получаем текущий блок
             try:
-                current_block = self.w3.eth.block_number
+                await self._ensure_async_rpc_session()
+                async with self.rpc_limiter:
+                    # Логи скана читаем у того же провайдера, что вернул текущий блок
+                    current_block, head_w3 = await self._rpc_call(lambda w3: w3.eth.block_number)
+                
+                last_processed = self.last_processed_blocks.get('transfers')
+                if last_processed is not None and current_block <= last_processed:
+                    self.logger.info(f"⏭️ No new blocks since {last_processed}, skipping scan")
+                    return
+                
+                # Последние blocks_lookback блоков перечитываем с перекрытием: у головы цепи возможны
+                # реорги и отстающие ноды балансировщика, вернувшие пустые логи. Повторно найденные
+                # транзакции отсекает seen_tx_hashes
                 lookback_blocks = MONITORING_CONFIG['blocks_lookback']
-                from_block = max(1, current_block - lookback_blocks)
+                if last_processed is None:
+                    from_block = max(1, current_block - lookback_blocks)
+                else:
+                    from_block = max(1, last_processed + 1 - lookback_blocks)
                 
                 self.logger.info(f"🔍 Current block: {current_block}, scanning from {from_block}")
                 
+            except CircuitOpenError:
+                self.logger.warning("⛔ Ethereum RPC circuit is open, skipping cycle")
+                return
             except Exception as block_error:
                 self.logger.error(f"❌ Failed to get current block: {block_error}")
                 return
             
-            # Сканируем каждый токен
-            tokens_scanned = 0
-            total_tokens = len(self.token_contracts.keys())
+            # Сканируем трансферы всех токенов одним запросом
+            total_tokens = len(self.token_contracts)
+            self.logger.info(f"🔍 Scanning transfers of {total_tokens} tokens...")
+            scanned_to_block = await self._scan_transfers(head_w3, from_block, current_block)
+            if scanned_to_block is not None:
+                self.last_processed_blocks['transfers'] = scanned_to_block
             
-            for token_key in self.token_contracts.keys():
-                try:
-                    tokens_scanned += 1
-                    self.logger.info(f"🔍 Scanning {token_key} transfers... ({tokens_scanned}/{total_tokens})")
-                    await self._scan_token_transfers(token_key, from_block, current_block)
-                    self.logger.info(f"✅ {token_key} scan completed")
-                    
-                except Exception as token_error:
-                    self.logger.error(f"❌ Failed to scan {token_key}: {token_error}")
-                    continue  # Продолжаем с следующим токеном
-            
-            self.logger.info(f"✅ Whale monitoring cycle completed successfully! Scanned {tokens_scanned}/{total_tokens} tokens")
+            self.logger.info(f"✅ Whale monitoring cycle completed successfully! Scanned {total_tokens} tokens")
             
         except Exception as e:
             self.logger.error(f"❌ Critical error in whale monitoring cycle: {e}")
             import traceback
             self.logger.error(f"Cycle error traceback: {traceback.format_exc()}")
     
+    @property
+    def effective_interval(self) -> float:
+        """Интервал до следующего цикла: удваивается с каждым тихим циклом подряд (до max_check_interval).
+        Пропусков нет - следующий скан продолжает с last_processed_blocks, но алерт может прийти
+        с задержкой до max_check_interval. По умолчанию max_check_interval == check_interval (без замедления)"""
+        interval = MONITORING_CONFIG['check_interval'] * 2 ** min(self.idle_streak, 10)
+        return min(interval, MONITORING_CONFIG['max_check_interval'])
+    
+    def close(self):
+        """Закрытие HTTP сессии RPC при остановке"""
+        try:
+            self.rpc_session.close()
+            self.logger.info("🔌 Closed Ethereum RPC session")
+        except Exception as e:
+            self.logger.error(f"❌ Failed to close Ethereum RPC session: {e}")
+    
+    async def close_async(self):
+        """Закрытие aiohttp сессии асинхронного RPC клиента (вызывается внутри event loop)"""
+        try:
+            if self.rpc_async_session and not self.rpc_async_session.closed:
+                await self.rpc_async_session.close()
+                self.logger.info("🔌 Closed async Ethereum RPC session")
+        except Exception as e:
+            self.logger.error(f"❌ Failed to close async Ethereum RPC session: {e}")
+    
     def get_monitoring_stats(self) -> Dict[str, Any]:
         """Получение статистики мониторинга"""
         return {
@@ -397,5 +766,7 @@ class BIOWhaleMonitor:
             'token_threshold': WHALE_THRESHOLDS['token_amount'],
             'usd_threshold': WHALE_THRESHOLDS['usd_amount'],
             'check_interval': MONITORING_CONFIG['check_interval'],
-            'price_cache_age': time.time() - self.last_price_update if self.last_price_update else 0
+            'effective_interval': self.effective_interval,
+            'price_cache_age': time.monotonic() - self.last_price_update if self.last_price_update is not None else 0,
+            'rpc_wins': dict(self.rpc_wins)
         } 
\ No newline at end of file
@@ -7,6 +7,8 @@ Notification System для DAO Treasury Monitor
 import os
 import logging
 import asyncio
+from bisect import bisect_right
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Union
 from decimal import Decimal
@@ -16,13 +18,25 @@ from .telegram_bot import TelegramNotifier
 
 logger = logging.getLogger(__name__)
 
+# Предел истории алертов в памяти (история хранится не дольше 24 часов)
+NOTIFICATION_HISTORY_LIMIT = 10_000
+
+# Пороги критичности по возрастанию: уровень = число пройденных порогов (bisect)
+TRANSACTION_SEVERITY_THRESHOLDS = (25_000, 50_000, 100_000)  # $25K+, $50K+, $100K+
+TRANSACTION_SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+PRICE_SEVERITY_THRESHOLDS = (10, 20)  # 10%+, 20%+
+PRICE_SEVERITY_LEVELS = ('low', 'medium', 'high')
+
 class NotificationSystem:
     """Центральная система уведомлений"""
     
     def __init__(self, database: DAOTreasuryDatabase):
         self.database = database
         self.telegram = None
-        self.notification_history = []
+        # Записи добавляются по времени: старые удаляются слева, свежие считаются справа
+        self.notification_history: deque = deque(maxlen=NOTIFICATION_HISTORY_LIMIT)
+        # Время последнего алерта по (alert_type, dao_name) для O(1) проверки rate limit
+        self.last_alert_times: Dict[tuple, datetime] = {}
         
         # Настройки
         self.rate_limit_seconds = 30  # Минимальный интервал между однотипными алертами
@@ -61,26 +75,17 @@ class NotificationSystem:
             current_time = datetime.now()
             
             # Проверяем лимит по типу алерта и DAO
-            recent_alerts = [
-                alert for alert in self.notification_history
-                if (current_time - alert['timestamp']).total_seconds() < self.rate_limit_seconds
-                and alert['alert_type'] == alert_type
-                and alert['dao_name'] == dao_name
-            ]
-            
-            if recent_alerts:
+            last_alert_time = self.last_alert_times.get((alert_type, dao_name))
+            if last_alert_time and (current_time - last_alert_time).total_seconds() < self.rate_limit_seconds:
                 logger.debug(f"Rate limited: {alert_type} for {dao_name}")
                 return True
             
             # Проверяем общий лимит алертов в час
             hour_ago = current_time - timedelta(hours=1)
-            recent_hour_alerts = [
-                alert for alert in self.notification_history
-                if alert['timestamp'] > hour_ago
-            ]
+            recent_hour_alerts = self._count_alerts_since(hour_ago)
             
-            if len(recent_hour_alerts) >= self.max_alerts_per_hour:
-                logger.warning(f"Hourly alert limit reached: {len(recent_hour_alerts)}")
+            if recent_hour_alerts >= self.max_alerts_per_hour:
+                logger.warning(f"Hourly alert limit reached: {recent_hour_alerts}")
                 return True
             
             return False
@@ -89,8 +94,17 @@ class NotificationSystem:
             logger.error(f"Error checking rate limit: {e}")
             return False
     
-    def add_to_history(self, alert_data: Dict[str, Any]):
-        """Добавляет алерт в историю для rate limiting"""
+    def _count_alerts_since(self, since: datetime) -> int:
+        """Количество алертов после since (просматриваются только свежие записи с конца истории)"""
+        count = 0
+        for alert in reversed(self.notification_history):
+            if alert['timestamp'] <= since:
+                break
+            count += 1
+        return count
+    
+    def add_to_history(self, alert_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Добавляет алерт в историю для rate limiting (возвращает запись истории)"""
         try:
             history_entry = {
                 'timestamp': datetime.now(),
@@ -100,16 +114,39 @@ class NotificationSystem:
             }
             
             self.notification_history.append(history_entry)
+            self.last_alert_times[(history_entry['alert_type'], history_entry['dao_name'])] = history_entry['timestamp']
             
             # Очищаем старую историю (больше 24 часов)
             day_ago = datetime.now() - timedelta(hours=24)
-            self.notification_history = [
-                alert for alert in self.notification_history
-                if alert['timestamp'] > day_ago
-            ]
+            while self.notification_history and self.notification_history[0]['timestamp'] <= day_ago:
+                self.notification_history.popleft()
+            self.last_alert_times = {
+                key: timestamp for key, timestamp in self.last_alert_times.items()
+                if timestamp > day_ago
+            }
+            return history_entry
             
         except Exception as e:
             logger.error(f"Error adding to history: {e}")
+            return None
+    
+    def _release_history_entry(self, history_entry: Optional[Dict[str, Any]],
+                               previous_alert_time: Optional[datetime]):
+        """Откат зарезервированной записи истории, если алерт не был отправлен"""
+        if history_entry is None:
+            return
+        try:
+            self.notification_history.remove(history_entry)
+        except ValueError:
+            pass
+        key = (history_entry['alert_type'], history_entry['dao_name'])
+        # Время не трогаем, если слот уже занял более поздний алерт
+        if self.last_alert_times.get(key) != history_entry['timestamp']:
+            return
+        if previous_alert_time is None:
+            self.last_alert_times.pop(key, None)
+        else:
+            self.last_alert_times[key] = previous_alert_time
     
     async def send_alert(self, alert_data: Dict[str, Any]) -> bool:
         """Отправляет алерт через все подключенные каналы"""
@@ -122,27 +159,33 @@ class NotificationSystem:
                 logger.debug(f"Alert rate limited: {alert_type} - {dao_name}")
                 return False
             
+            # Слот rate limit резервируем до отправки (без await между проверкой и записью):
+            # алерты, отправляемые конкурентно, сразу видят его. Если отправка не удалась - откатываем
+            previous_alert_time = self.last_alert_times.get((alert_type, dao_name))
+            history_entry = self.add_to_history(alert_data)
+            
             # Добавляем timestamp если не указан
             if 'timestamp' not in alert_data:
                 alert_data['timestamp'] = datetime.now()
             
             success = False
+            try:
+                # Отправляем в Telegram
+                if self.telegram:
+                    try:
+                        telegram_success = await self.telegram.send_alert(alert_data)
+                        if telegram_success:
+                            success = True
+                            # Обновляем статус в базе данных
+                            await self._update_alert_status(alert_data, 'telegram', True)
+                    except Exception as e:
+                        logger.error(f"Telegram alert failed: {e}")
+                        await self._update_alert_status(alert_data, 'telegram', False)
+            finally:
+                if not success:
+                    self._release_history_entry(history_entry, previous_alert_time)
             
-            # Отправляем в Telegram
-            if self.telegram:
-                try:
-                    telegram_success = await self.telegram.send_alert(alert_data)
-                    if telegram_success:
-                        success = True
-                        # Обновляем статус в базе данных
-                        await self._update_alert_status(alert_data, 'telegram', True)
-                except Exception as e:
-                    logger.error(f"Telegram alert failed: {e}")
-                    await self._update_alert_status(alert_data, 'telegram', False)
-            
-            # Добавляем в историю для rate limiting
             if success:
-                self.add_to_history(alert_data)
                 logger.info(f"Alert sent successfully: {alert_type} - {dao_name}")
             
             return success
@@ -220,24 +263,11 @@ class NotificationSystem:
     
     def _get_transaction_severity(self, amount_usd: float) -> str:
         """Определяет критичность транзакции по сумме"""
-        if amount_usd >= 100000:  # $100K+
-            return 'critical'
-        elif amount_usd >= 50000:  # $50K+
-            return 'high'
-        elif amount_usd >= 25000:  # $25K+
-            return 'medium'
-        else:
-            return 'low'
+        return TRANSACTION_SEVERITY_LEVELS[bisect_right(TRANSACTION_SEVERITY_THRESHOLDS, amount_usd)]
     
     def _get_price_severity(self, change_percentage: float) -> str:
         """Определяет критичность ценового изменения"""
-        abs_change = abs(change_percentage)
-        if abs_change >= 20:  # 20%+
-            return 'high'
-        elif abs_change >= 10:  # 10%+
-            return 'medium'
-        else:
-            return 'low'
+        return PRICE_SEVERITY_LEVELS[bisect_right(PRICE_SEVERITY_THRESHOLDS, abs(change_percentage))]
     
     def _format_transaction_message(self, transaction_data: Dict[str, Any]) -> str:
         """Форматирует сообщение о транзакции"""
@@ -282,7 +312,8 @@ class NotificationSystem:
         """Генерирует данные для ежедневной сводки"""
         try:
             # Получаем транзакции за последние 24 часа
-            recent_transactions = self.database.get_recent_treasury_transactions(hours=24)
+            # Запрос к БД синхронный - выполняем его в отдельном потоке
+            recent_transactions = await asyncio.to_thread(self.database.get_recent_treasury_transactions, hours=24)
             
             total_volume = sum(tx.get('amount_usd', 0) for tx in recent_transactions)
             
@@ -359,22 +390,16 @@ class NotificationSystem:
             
             # Статистика за последний час
             hour_ago = current_time - timedelta(hours=1)
-            recent_alerts = [
-                alert for alert in self.notification_history
-                if alert['timestamp'] > hour_ago
-            ]
+            recent_alerts = self._count_alerts_since(hour_ago)
             
             # Статистика за последние 24 часа
             day_ago = current_time - timedelta(hours=24)
-            daily_alerts = [
-                alert for alert in self.notification_history
-                if alert['timestamp'] > day_ago
-            ]
+            daily_alerts = self._count_alerts_since(day_ago)
             
             return {
-                'alerts_last_hour': len(recent_alerts),
-                'alerts_last_24h': len(daily_alerts),
-                'rate_limit_active': len(recent_alerts) >= self.max_alerts_per_hour,
+                'alerts_last_hour': recent_alerts,
+                'alerts_last_24h': daily_alerts,
+                'rate_limit_active': recent_alerts >= self.max_alerts_per_hour,
                 'telegram_enabled': self.telegram is not None and self.telegram.enabled,
                 'history_size': len(self.notification_history)
             }
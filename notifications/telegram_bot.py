@@ -18,6 +18,36 @@ import httpx
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Эмодзи в зависимости от критичности
+SEVERITY_EMOJI = {
+    'low': '🟢',
+    'medium': '🟡', 
+    'high': '🔴',
+    'critical': '🚨'
+}
+
+# Эмодзи и цвет ценового алерта по типу: (emoji, color)
+PRICE_ALERT_STYLES = {
+    'price_drop': ('📉', '🔴'),
+    'price_spike': ('📈', '🟢'),
+}
+
+# Шапка алерта о транзакции: собирается одним format вместо цепочки конкатенаций
+TRANSACTION_ALERT_HEADER = (
+    "{severity_emoji} **{title}**\n\n"
+    "🏛️ **DAO:** {dao_name}\n"
+    "💰 **Amount:** ${amount_usd:,.2f}\n"
+)
+
+# Метод форматирования по типу алерта (остальные типы - format_generic_alert)
+ALERT_FORMATTERS = {
+    'large_transaction': 'format_transaction_alert',
+    'treasury_transaction': 'format_transaction_alert',
+    'price_drop': 'format_price_alert',
+    'price_spike': 'format_price_alert',
+    'price_change': 'format_price_alert',
+}
+
 class TelegramNotifier:
     """Класс для отправки уведомлений в Telegram"""
     
@@ -68,18 +98,15 @@ class TelegramNotifier:
             tx_hash = alert_data.get('tx_hash', '')
             severity = alert_data.get('severity', 'medium')
             
-            # Эмодзи в зависимости от критичности
-            severity_emoji = {
-                'low': '🟢',
-                'medium': '🟡', 
-                'high': '🔴',
-                'critical': '🚨'
-            }.get(severity, '⚠️')
+            severity_emoji = SEVERITY_EMOJI.get(severity, '⚠️')
             
-            # Базовая структура сообщения
-            message = f"{severity_emoji} **{alert_data.get('title', 'Treasury Alert')}**\n\n"
-            message += f"🏛️ **DAO:** {dao_name}\n"
-            message += f"💰 **Amount:** ${amount_usd:,.2f}\n"
+            # Базовая структура сообщения; строки собираются в список и склеиваются один раз
+            parts = [TRANSACTION_ALERT_HEADER.format(
+                severity_emoji=severity_emoji,
+                title=alert_data.get('title', 'Treasury Alert'),
+                dao_name=dao_name,
+                amount_usd=amount_usd
+            )]
             
             # Дополнительные данные из metadata
             metadata = alert_data.get('metadata', {})
@@ -87,15 +114,15 @@ class TelegramNotifier:
                 if 'token_symbol' in metadata:
                     token_amount = metadata.get('token_amount', 0)
                     token_symbol = metadata.get('token_symbol', '')
-                    message += f"🪙 **Token:** {token_amount:,.2f} {token_symbol}\n"
+                    parts.append(f"🪙 **Token:** {token_amount:,.2f} {token_symbol}\n")
                 
                 if 'blockchain' in metadata:
-                    message += f"⛓️ **Chain:** {metadata['blockchain'].title()}\n"
+                    parts.append(f"⛓️ **Chain:** {metadata['blockchain'].title()}\n")
                 
                 if 'tx_type' in metadata:
                     tx_type = metadata['tx_type']
                     direction_emoji = '📤' if tx_type == 'outgoing' else '📥'
-                    message += f"{direction_emoji} **Type:** {tx_type.title()}\n"
+                    parts.append(f"{direction_emoji} **Type:** {tx_type.title()}\n")
             
             # Время
             timestamp = alert_data.get('timestamp')
@@ -104,18 +131,18 @@ class TelegramNotifier:
                     timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
                 elif isinstance(timestamp, datetime):
                     pass
-                message += f"⏰ **Time:** {timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
+                parts.append(f"⏰ **Time:** {timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
             
             # Хэш транзакции (полный)
             if tx_hash:
-                message += f"🔗 **TX:** `{tx_hash}`\n"
+                parts.append(f"🔗 **TX:** `{tx_hash}`\n")
             
             # Описание
             description = alert_data.get('message', '')
             if description:
-                message += f"\n📝 **Details:** {description}"
+                parts.append(f"\n📝 **Details:** {description}")
             
-            return message
+            return ''.join(parts)
             
         except Exception as e:
             logger.error(f"Error formatting transaction alert: {e}")
@@ -129,15 +156,7 @@ class TelegramNotifier:
             alert_type = alert_data.get('alert_type', 'price_change')
             
             # Определяем эмодзи и цвет по типу алерта
-            if alert_type == 'price_drop':
-                emoji = '📉'
-                color = '🔴'
-            elif alert_type == 'price_spike':
-                emoji = '📈'
-                color = '🟢'
-            else:
-                emoji = '📊'
-                color = '🟡'
+            emoji, color = PRICE_ALERT_STYLES.get(alert_type, ('📊', '🟡'))
             
             message = f"{color} {emoji} Price Alert - {token_symbol}\n\n"
             message += f"🏛️ DAO: {dao_name}\n"
@@ -189,13 +208,7 @@ class TelegramNotifier:
             message_text = alert_data.get('message', '')
             dao_name = alert_data.get('dao_name', '')
             
-            # Эмодзи в зависимости от критичности
-            severity_emoji = {
-                'low': '🟢',
-                'medium': '🟡', 
-                'high': '🔴',
-                'critical': '🚨'
-            }.get(severity, '⚠️')
+            severity_emoji = SEVERITY_EMOJI.get(severity, '⚠️')
             
             message = f"{severity_emoji} **{title}**\n\n"
             
@@ -230,12 +243,8 @@ class TelegramNotifier:
             # Определяем тип алерта и форматируем сообщение
             alert_type = alert_data.get('alert_type', 'general')
             
-            if alert_type in ['large_transaction', 'treasury_transaction']:
-                message = self.format_transaction_alert(alert_data)
-            elif alert_type in ['price_drop', 'price_spike', 'price_change']:
-                message = self.format_price_alert(alert_data)
-            else:
-                message = self.format_generic_alert(alert_data)
+            formatter = getattr(self, ALERT_FORMATTERS.get(alert_type, 'format_generic_alert'))
+            message = formatter(alert_data)
             
             # Отправляем сообщение
             await self.bot.send_message(
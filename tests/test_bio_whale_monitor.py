@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Тесты BIO Whale Monitor без сети: провайдеры, логи и база данных подменены заглушками
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+import pytest
+
+from config.whale_config import BIO_TOKENS, WHALE_THRESHOLDS
+from monitors.bio_whale_monitor import BIOWhaleMonitor, TRANSFER_EVENT_TOPIC
+from utils.rate_limiter import AsyncTokenBucket
+
+WALLET = '0x' + '11' * 20
+RECIPIENT = '0x' + '22' * 20
+TX_HASH = bytes.fromhex('ab' * 32)
+
+
+def make_hedged_monitor(limiter):
+    monitor = BIOWhaleMonitor.__new__(BIOWhaleMonitor)
+    monitor.async_w3 = 'primary'
+    monitor.fallback_async_w3 = 'fallback'
+    monitor.rpc_hedge_delay = 0.01
+    monitor.rpc_limiter = limiter
+    monitor.rpc_wins = {'primary': 0, 'fallback': 0}
+    return monitor
+
+
+class HangingCalls:
+    """RPC вызов, который не завершается; запоминает запущенные запросы"""
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, w3):
+        self.started.append(w3)
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(w3)
+            raise
+
+
+async def cancel_hedged_rpc(monitor, calls, delay):
+    caller = asyncio.ensure_future(monitor._hedged_rpc(calls))
+    await asyncio.sleep(delay)
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    # Даем отмененным запросам обработать CancelledError
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_hedged_rpc_cancels_primary_when_cancelled_before_hedge():
+    calls = HangingCalls()
+    monitor = make_hedged_monitor(AsyncTokenBucket(rate=10, capacity=1))
+    monitor.rpc_hedge_delay = 10
+
+    await cancel_hedged_rpc(monitor, calls, 0.01)
+
+    assert calls.started == ['primary']
+    assert calls.cancelled == ['primary']
+
+
+@pytest.mark.asyncio
+async def test_hedged_rpc_cancels_primary_when_cancelled_waiting_for_limiter():
+    calls = HangingCalls()
+    # Пустой бакет: хедж ждет токен ~10 секунд
+    limiter = AsyncTokenBucket(rate=0.1, capacity=1)
+    await limiter.acquire()
+    monitor = make_hedged_monitor(limiter)
+
+    await cancel_hedged_rpc(monitor, calls, 0.05)
+
+    assert calls.started == ['primary']
+    assert calls.cancelled == ['primary']
+
+
+@pytest.mark.asyncio
+async def test_hedged_rpc_returns_fallback_and_cancels_primary():
+    started = []
+
+    async def call(w3):
+        started.append(w3)
+        if w3 == 'primary':
+            await asyncio.Event().wait()
+        return 42
+
+    monitor = make_hedged_monitor(AsyncTokenBucket(rate=10, capacity=1))
+
+    result = await monitor._hedged_rpc(call)
+
+    assert result == (42, 'fallback')
+    assert monitor.rpc_wins == {'primary': 0, 'fallback': 1}
+
+
+class FakeDatabase:
+    """База данных, запоминающая сохраненные whale транзакции"""
+
+    def __init__(self):
+        self.saved = []
+
+    def save_treasury_transactions(self, transactions):
+        self.saved.extend(transactions)
+        return True
+
+
+def address_topic(address):
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def make_transfer_log(amount_tokens, log_index, tx_hash=TX_HASH):
+    return {
+        'address': BIO_TOKENS['BIO']['contract_address'],
+        'topics': [
+            bytes.fromhex(TRANSFER_EVENT_TOPIC[2:]),
+            address_topic(WALLET),
+            address_topic(RECIPIENT),
+        ],
+        'data': (amount_tokens * 10 ** BIO_TOKENS['BIO']['decimals']).to_bytes(32, 'big'),
+        'transactionHash': tx_hash,
+        'logIndex': log_index,
+        'blockNumber': 5,
+    }
+
+
+def make_scan_monitor(logs):
+    monitor = BIOWhaleMonitor.__new__(BIOWhaleMonitor)
+    monitor.logger = logging.getLogger('test_bio_whale_monitor')
+    monitor.database = FakeDatabase()
+    monitor.monitored_address_set = frozenset([WALLET])
+    monitor.checksum_addresses = {WALLET: WALLET}
+    monitor.token_contracts = {token_key: None for token_key in BIO_TOKENS}
+    monitor.token_addresses = [token_info['contract_address'] for token_info in BIO_TOKENS.values()]
+    monitor.wallet_topics = []
+    monitor.seen_tx_hashes = OrderedDict()
+    monitor.idle_streak = 0
+    monitor.usd_threshold = float(WHALE_THRESHOLDS['usd_amount'])
+    monitor.token_divisors = {
+        token_key: 10 ** token_info['decimals'] for token_key, token_info in BIO_TOKENS.items()
+    }
+    monitor.raw_token_thresholds = {
+        token_key: WHALE_THRESHOLDS['token_amount'] * divisor
+        for token_key, divisor in monitor.token_divisors.items()
+    }
+    monitor.price_cache = {'BIO': 0.01, 'vBIO': 0.01}
+    monitor.alerts = []
+
+    async def get_transfer_logs(semaphore, w3, from_block, to_block):
+        return logs
+
+    async def update_token_prices():
+        pass
+
+    async def apply_block_timestamps(transactions):
+        pass
+
+    async def send_whale_alert(semaphore, transaction_data):
+        monitor.alerts.append(transaction_data)
+
+    monitor._get_transfer_logs = get_transfer_logs
+    monitor._update_token_prices = update_token_prices
+    monitor._apply_block_timestamps = apply_block_timestamps
+    monitor._send_whale_alert = send_whale_alert
+    return monitor
+
+
+@pytest.mark.asyncio
+async def test_scan_keeps_whale_transfer_after_small_transfer_in_same_tx():
+    # Первый трансфер транзакции мелкий, второй - whale: транзакция не должна отсеяться по первому
+    monitor = make_scan_monitor([make_transfer_log(1, 0), make_transfer_log(10_000_000, 1)])
+
+    assert await monitor._scan_transfers(None, 1, 5) == 5
+
+    assert len(monitor.database.saved) == 1
+    whale = monitor.database.saved[0]
+    assert whale['tx_hash'] == '0x' + TX_HASH.hex()
+    assert whale['amount'] == pytest.approx(10_000_000)
+    assert monitor.alerts == [whale]
+    assert whale['tx_hash'] in monitor.seen_tx_hashes
+
+
+@pytest.mark.asyncio
+async def test_rescan_of_overlapping_blocks_does_not_repeat_whale():
+    monitor = make_scan_monitor([make_transfer_log(10_000_000, 0)])
+
+    await monitor._scan_transfers(None, 1, 5)
+    await monitor._scan_transfers(None, 1, 5)
+
+    assert len(monitor.database.saved) == 1
+    assert len(monitor.alerts) == 1
+    assert monitor.idle_streak == 1
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Тесты circuit breaker: размыкание, отклонение запросов, полуоткрытая проба
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+async def succeed():
+    return 'ok'
+
+
+async def fail():
+    raise ConnectionError('rpc down')
+
+
+async def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+
+
+def expire_recovery_timeout(breaker):
+    breaker.retry_at = time.monotonic() - 1
+
+
+@pytest.mark.asyncio
+async def test_opens_after_failure_threshold():
+    breaker = CircuitBreaker('rpc', failure_threshold=3, recovery_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+    assert breaker.state == CLOSED
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+    assert breaker.state == OPEN
+    # Пауза recovery_timeout с джиттером 0.8-1.2
+    assert 24 <= breaker.retry_at - time.monotonic() <= 36
+
+
+@pytest.mark.asyncio
+async def test_rejects_requests_while_open():
+    breaker = CircuitBreaker('rpc', failure_threshold=2)
+    await open_breaker(breaker)
+    called = []
+
+    async def request():
+        called.append(True)
+        return 'ok'
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(request)
+    assert not called
+
+
+@pytest.mark.asyncio
+async def test_half_open_allows_single_probe_and_closes_on_success():
+    breaker = CircuitBreaker('rpc', failure_threshold=2)
+    await open_breaker(breaker)
+    expire_recovery_timeout(breaker)
+    release = asyncio.Event()
+
+    async def probe():
+        await release.wait()
+        return 'ok'
+
+    probe_task = asyncio.ensure_future(breaker.call(probe))
+    await asyncio.sleep(0)
+    assert breaker.state == HALF_OPEN
+
+    # Пока проба не завершилась, остальные запросы отклоняются
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+
+    release.set()
+    assert await probe_task == 'ok'
+    assert breaker.state == CLOSED
+    assert breaker.failure_count == 0
+    assert await breaker.call(succeed) == 'ok'
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_with_longer_timeout():
+    breaker = CircuitBreaker('rpc', failure_threshold=2, recovery_timeout=10)
+    await open_breaker(breaker)
+    expire_recovery_timeout(breaker)
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(fail)
+
+    assert breaker.state == OPEN
+    assert not breaker.probe_in_flight
+    # Вторая пауза вдвое длиннее первой
+    assert 16 <= breaker.retry_at - time.monotonic() <= 24
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_slot():
+    breaker = CircuitBreaker('rpc', failure_threshold=2)
+    await open_breaker(breaker)
+    expire_recovery_timeout(breaker)
+
+    probe_task = asyncio.ensure_future(breaker.call(lambda: asyncio.Event().wait()))
+    await asyncio.sleep(0)
+    assert breaker.probe_in_flight
+
+    probe_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe_task
+
+    # Отмена не считается ошибкой провайдера и не блокирует следующую пробу
+    assert breaker.state == HALF_OPEN
+    assert not breaker.probe_in_flight
+    assert await breaker.call(succeed) == 'ok'
+    assert breaker.state == CLOSED
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Тесты rate limiting системы уведомлений при конкурентной отправке алертов
+"""
+
+import asyncio
+
+import pytest
+
+from notifications.notification_system import NotificationSystem
+
+
+class FakeTelegram:
+    """Telegram-клиент, который отвечает с задержкой, как настоящий API"""
+
+    def __init__(self, result=True):
+        self.result = result
+        self.sent = []
+
+    async def send_alert(self, alert_data):
+        await asyncio.sleep(0.01)
+        self.sent.append(alert_data['tx_hash'])
+        return self.result
+
+
+def make_notification_system(telegram):
+    notification_system = NotificationSystem(database=None)
+    notification_system.telegram = telegram
+    return notification_system
+
+
+def make_transaction(index, dao_name='BIO Whale'):
+    return {
+        'dao_name': dao_name,
+        'tx_hash': f'0x{index:064x}',
+        'amount_usd': 100_000 + index,
+        'amount': 1_000_000,
+        'token_symbol': 'BIO',
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_burst_sends_only_first_alert(monkeypatch):
+    monkeypatch.delenv('TELEGRAM_BOT_TOKEN', raising=False)
+    telegram = FakeTelegram()
+    notification_system = make_notification_system(telegram)
+
+    results = await asyncio.gather(*(
+        notification_system.send_transaction_alert(make_transaction(index))
+        for index in range(7)
+    ))
+
+    assert results == [True] + [False] * 6
+    assert telegram.sent == [make_transaction(0)['tx_hash']]
+    assert len(notification_system.notification_history) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_burst_respects_hourly_limit(monkeypatch):
+    monkeypatch.delenv('TELEGRAM_BOT_TOKEN', raising=False)
+    telegram = FakeTelegram()
+    notification_system = make_notification_system(telegram)
+    notification_system.max_alerts_per_hour = 3
+
+    results = await asyncio.gather(*(
+        notification_system.send_transaction_alert(make_transaction(index, dao_name=f'DAO {index}'))
+        for index in range(7)
+    ))
+
+    assert results == [True] * 3 + [False] * 4
+    assert len(telegram.sent) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_send_releases_reserved_slot(monkeypatch):
+    monkeypatch.delenv('TELEGRAM_BOT_TOKEN', raising=False)
+    notification_system = make_notification_system(FakeTelegram(result=False))
+
+    assert await notification_system.send_transaction_alert(make_transaction(0)) is False
+    assert not notification_system.notification_history
+    assert not notification_system.last_alert_times
+
+    telegram = FakeTelegram()
+    notification_system.telegram = telegram
+    assert await notification_system.send_transaction_alert(make_transaction(1)) is True
+    assert telegram.sent == [make_transaction(1)['tx_hash']]
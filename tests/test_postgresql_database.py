@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Тесты PostgreSQL адаптера на курсоре со строками-словарями (как RealDictCursor в пуле)
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from database.postgresql_database import PostgreSQLDatabase
+
+
+class DictRowCursor:
+    """Курсор, возвращающий строки-словари, как RealDictCursor"""
+
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+        self.returned = []
+
+    def getconn(self):
+        return self.connection
+
+    def putconn(self, conn):
+        self.returned.append(conn)
+
+
+def make_database(row):
+    database = PostgreSQLDatabase.__new__(PostgreSQLDatabase)
+    database.connection_pool = FakePool(FakeConnection(DictRowCursor(row)))
+    return database
+
+
+def test_get_latest_token_price_reads_dict_rows():
+    timestamp = datetime(2026, 1, 1, 12, 0, 0)
+    database = make_database({
+        'token_address': '0xbio',
+        'token_symbol': 'BIO',
+        'blockchain': 'ethereum',
+        'price_usd': Decimal('0.1234'),
+        'timestamp': timestamp,
+        'market_cap_usd': None,
+        'volume_24h_usd': None,
+        'price_change_24h': None,
+        'metadata': {'source': 'coingecko'},
+    })
+
+    price = database.get_latest_token_price('0xbio')
+
+    assert price['token_symbol'] == 'BIO'
+    assert price['price_usd'] == pytest.approx(0.1234)
+    assert price['timestamp'] == timestamp
+    assert price['metadata'] == {'source': 'coingecko'}
+    assert database.connection_pool.returned
+
+
+def test_get_latest_token_price_without_rows():
+    database = make_database(None)
+
+    assert database.get_latest_token_price('0xbio') is None
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Тесты token bucket: всплеск до capacity, далее не чаще rate запросов в секунду
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.rate_limiter import AsyncTokenBucket
+
+
+@pytest.mark.asyncio
+async def test_burst_up_to_capacity_is_not_throttled():
+    bucket = AsyncTokenBucket(rate=1, capacity=5)
+
+    started = time.monotonic()
+    for _ in range(5):
+        await bucket.acquire()
+
+    assert time.monotonic() - started < 0.05
+
+
+@pytest.mark.asyncio
+async def test_requests_beyond_capacity_wait_for_refill():
+    bucket = AsyncTokenBucket(rate=20, capacity=2)
+
+    started = time.monotonic()
+    # 2 токена сразу, еще 4 - по одному каждые 1/20 секунды
+    await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+    elapsed = time.monotonic() - started
+
+    assert 0.18 <= elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_context_manager_takes_token():
+    bucket = AsyncTokenBucket(rate=10, capacity=1)
+
+    async with bucket:
+        pass
+
+    assert bucket.tokens < 1
+    started = time.monotonic()
+    async with bucket:
+        pass
+    assert time.monotonic() - started >= 0.08
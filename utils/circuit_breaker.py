@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker
+Размыкатель цепи для запросов к внешним провайдерам: при серии ошибок запросы
+временно не отправляются, восстановление проверяется одиночным пробным запросом
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Запрос отклонен: цепь разомкнута"""
+
+class CircuitBreaker:
+    """Circuit breaker: после failure_threshold ошибок подряд цепь размыкается на recovery_timeout,
+    каждая неудачная проба удваивает паузу (с джиттером) вплоть до max_recovery_timeout"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 max_recovery_timeout: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.state = CLOSED
+        self.failure_count = 0
+        self.open_count = 0
+        self.retry_at = 0.0
+        self.probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос (в полуоткрытом состоянии пропускается одна проба)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self.retry_at:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        """Успешный запрос замыкает цепь"""
+        self.state = CLOSED
+        self.failure_count = 0
+        self.open_count = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        """Ошибка запроса; неудачная проба или превышение порога размыкает цепь"""
+        self.failure_count += 1
+        if self.state == HALF_OPEN or self.failure_count >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        """Размыкание цепи с экспоненциально растущей паузой и джиттером"""
+        delay = min(self.max_recovery_timeout, self.recovery_timeout * 2 ** self.open_count)
+        self.retry_at = time.monotonic() + delay * random.uniform(0.8, 1.2)
+        self.open_count += 1
+        self.state = OPEN
+        self.probe_in_flight = False
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнение запроса через circuit breaker"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            # Отмена - не ошибка провайдера, но пробу надо освободить, иначе цепь не замкнется
+            self.probe_in_flight = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
@@ -4,9 +4,12 @@
 Использует CoinGecko API для получения текущих цен токенов
 """
 
+import asyncio
 import httpx
 import logging
+import random
 import time
+from functools import cache
 from typing import Dict, Optional, Union, List
 from decimal import Decimal
 import os
@@ -18,37 +21,127 @@ COINGECKO_ENDPOINT = "https://pro-api.coingecko.com/api/v3/"
 # Используем API ключ из переменной окружения или fallback
 COINGECKO_API_KEY = os.getenv('COINGECKO_API_KEY', 'CG-9MrJcucBMMx5HKnXeVBD8oSb')
 
+# HTTP/2 доступен только при установленном пакете h2 (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson разбирает JSON ответы API в несколько раз быстрее stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def parse_json_response(response: httpx.Response):
+    """Разбор JSON тела ответа (через orjson, если установлен)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+# Настройки HTTP клиента: keep-alive пул, чтобы не платить TCP+TLS handshake на каждый запрос
+HTTP_TIMEOUT = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+# Повторы неудачных подключений (ConnectError/ConnectTimeout) на уровне транспорта
+HTTP_CONNECT_RETRIES = 2
+
+def create_http_client() -> httpx.AsyncClient:
+    """Создание httpx.AsyncClient с пулом keep-alive соединений"""
+    # При явном transport настройки пула и HTTP/2 задаются на нем, а не на клиенте
+    transport = httpx.AsyncHTTPTransport(
+        retries=HTTP_CONNECT_RETRIES, limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE
+    )
+    return httpx.AsyncClient(timeout=HTTP_TIMEOUT, transport=transport)
+
+# Общий HTTP клиент на всё время жизни приложения (переиспользует прогретые соединения между циклами)
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _discard_http_client(client: Optional[httpx.AsyncClient], loop: Optional[asyncio.AbstractEventLoop]):
+    """Закрытие клиента, созданного в другом event loop (aclose должен выполняться в его loop)"""
+    if client is None or client.is_closed:
+        return
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        logger.info("Closing shared HTTP client of a previous event loop")
+    else:
+        # Loop клиента остановлен: закрыть соединения из другого loop нельзя, отпускаем клиент,
+        # сокеты освободит сборщик мусора
+        logger.info("Discarding shared HTTP client of a stopped event loop")
+
+def get_http_client() -> httpx.AsyncClient:
+    """Получение общего httpx.AsyncClient (создается один раз на event loop)"""
+    global _http_client, _http_client_loop
+    
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        if _http_client_loop is not loop:
+            _discard_http_client(_http_client, _http_client_loop)
+        _http_client = create_http_client()
+        _http_client_loop = loop
+    
+    return _http_client
+
+async def close_http_client():
+    """Закрытие общего HTTP клиента при остановке приложения"""
+    global _http_client, _http_client_loop
+    
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        logger.info("Shared HTTP client closed")
+    
+    _http_client = None
+    _http_client_loop = None
+
 class PriceCache:
-    """Кэш для цен токенов"""
+    """Кэш для цен токенов с TTL на каждую запись"""
     
-    def __init__(self, ttl: int = 300):  # 5 минут TTL
+    def __init__(self, ttl: int = 300, jitter: int = 30):  # 5 минут TTL
         self.cache = {}
         self.ttl = ttl
-        self.last_update = {}
+        self.jitter = jitter
+        self.expires_at = {}
+        self.next_prune_at = time.monotonic() + ttl
     
     def get(self, key: str) -> Optional[Decimal]:
         """Получение цены из кэша"""
         if key not in self.cache:
             return None
         
-        if time.time() - self.last_update.get(key, 0) > self.ttl:
+        if time.monotonic() >= self.expires_at.get(key, 0):
             # Цена устарела
             del self.cache[key]
-            if key in self.last_update:
-                del self.last_update[key]
+            self.expires_at.pop(key, None)
             return None
         
         return self.cache[key]
     
     def set(self, key: str, value: Decimal):
         """Установка цены в кэш"""
+        now = time.monotonic()
         self.cache[key] = value
-        self.last_update[key] = time.time()
+        # Случайный разброс TTL, чтобы записи не истекали одновременно (защита от cache stampede)
+        self.expires_at[key] = now + self.ttl + random.uniform(-self.jitter, self.jitter)
+        
+        # Не чаще раза за TTL удаляем истекшие записи, которые больше никто не запрашивал
+        if now >= self.next_prune_at:
+            self.prune(now)
+    
+    def prune(self, now: Optional[float] = None):
+        """Удаление истекших записей из кэша"""
+        now = time.monotonic() if now is None else now
+        expired_keys = [key for key, expires_at in self.expires_at.items() if now >= expires_at]
+        for key in expired_keys:
+            self.cache.pop(key, None)
+            del self.expires_at[key]
+        self.next_prune_at = now + self.ttl
     
     def clear(self):
         """Очистка кэша"""
         self.cache.clear()
-        self.last_update.clear()
+        self.expires_at.clear()
 
 # Глобальный кэш цен
 price_cache = PriceCache()
@@ -57,6 +150,18 @@ def get_coingecko_api_key() -> str:
     """Получение API ключа CoinGecko"""
     return os.getenv('COINGECKO_API_KEY', COINGECKO_API_KEY)
 
+@cache
+def get_coingecko_headers() -> Dict[str, str]:
+    """Заголовки запросов к CoinGecko (собираются один раз; не изменять)"""
+    headers = {}
+    api_key = get_coingecko_api_key()
+    if api_key:
+        headers["x-cg-pro-api-key"] = api_key
+    return headers
+
+# Заголовки запросов к GeckoTerminal
+GECKOTERMINAL_HEADERS = {"Accept": "application/json"}
+
 async def get_token_price_coingecko(token_address: str, blockchain: str = 'ethereum', client: httpx.AsyncClient = None) -> Decimal:
     """
     Получение цены токена через CoinGecko API (как в pool_analyzer.py)
@@ -87,7 +192,6 @@ async def get_token_price_coingecko(token_address: str, blockchain: str = 'ether
             return Decimal('0')
         
         # Запрос к CoinGecko API (как в pool_analyzer.py)
-        api_key = get_coingecko_api_key()
         url = f"{COINGECKO_ENDPOINT}simple/token_price/{platform}"
         
         params = {
@@ -95,19 +199,13 @@ async def get_token_price_coingecko(token_address: str, blockchain: str = 'ether
             'vs_currencies': 'usd'
         }
         
-        headers = {}
-        if api_key:
-            headers["x-cg-pro-api-key"] = api_key
-        
-        # Создаем временный клиент если не передан
+        # Используем общий клиент если не передан
         if client is None:
-            async with httpx.AsyncClient(timeout=10.0) as temp_client:
-                response = await temp_client.get(url, params=params, headers=headers)
-        else:
-            response = await client.get(url, params=params, headers=headers)
+            client = get_http_client()
         
+        response = await client.get(url, params=params, headers=get_coingecko_headers())
         response.raise_for_status()
-        response_data = response.json()
+        response_data = parse_json_response(response)
         
         # Извлекаем цену
         token_data = response_data.get(token_address.lower(), {})
@@ -133,46 +231,67 @@ async def get_token_price_coingecko(token_address: str, blockchain: str = 'ether
         logger.error(f"Error fetching price for {token_address}: {e}")
         return Decimal('0')
 
+# Одновременных запросов к GeckoTerminal (бесплатный API ограничивает частоту)
+GECKOTERMINAL_MAX_CONCURRENCY = 5
+# Максимум адресов в одном запросе tokens/multi
+GECKOTERMINAL_MULTI_BATCH_SIZE = 30
+
+async def _get_token_prices_geckoterminal_batch(token_addresses: List[str], client: httpx.AsyncClient,
+                                                semaphore: asyncio.Semaphore) -> Dict[str, Decimal]:
+    """Получение цен пачки токенов из GeckoTerminal одним запросом tokens/multi"""
+    async with semaphore:
+        logger.info(f"Fetching prices from GeckoTerminal for {len(token_addresses)} tokens...")
+        https_url = f"https://api.geckoterminal.com/api/v2/networks/solana/tokens/multi/{','.join(token_addresses)}"
+        
+        try:
+            logger.debug(f"GeckoTerminal API request URL: {https_url}")
+            response = await client.get(https_url, headers=GECKOTERMINAL_HEADERS)
+            
+            logger.debug(f"GeckoTerminal response status: {response.status_code}")
+            
+            if response.status_code != 200:
+                logger.warning(f"GeckoTerminal: Could not fetch prices for {token_addresses}. Status: {response.status_code}")
+                return {}
+            
+            response_data = parse_json_response(response)
+            # Полный ответ сериализуем только при включенном DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("GeckoTerminal raw response: %s", response.text[:500])
+            
+            prices = {}
+            for token_data in (response_data or {}).get("data") or []:
+                attributes = token_data.get("attributes") or {}
+                token_address = attributes.get("address")
+                price_usd = attributes.get("price_usd")
+                if token_address and price_usd is not None and price_usd != "":
+                    logger.info(f"GeckoTerminal: Price for {token_address} = {price_usd} USD")
+                    prices[token_address] = Decimal(str(price_usd))
+            
+            return prices
+                
+        except httpx.HTTPError as e:
+            logger.warning(f"GeckoTerminal: HTTP error for {token_addresses}: {e}")
+        except Exception as e:
+            logger.warning(f"GeckoTerminal: Error fetching prices for {token_addresses}: {e}")
+        return {}
+
 async def get_token_prices_geckoterminal(token_addresses: List[str], client: httpx.AsyncClient) -> Dict[str, Decimal]:
     """Fetch token prices from GeckoTerminal API (copied from pool_analyzer.py)"""
     try:
-        prices = {}
-        
         logger.debug(f"STARTING GeckoTerminal price fetch for {len(token_addresses)} tokens: {token_addresses}")
         
-        for token_address in token_addresses:
-            logger.info(f"Fetching price from GeckoTerminal for token {token_address}...")
-            https_url = f"https://api.geckoterminal.com/api/v2/networks/solana/tokens/{token_address}"
-            
-            try:
-                headers = {"Accept": "application/json"}
-                logger.debug(f"GeckoTerminal API request URL: {https_url}")
-                response = await client.get(https_url, headers=headers)
-                
-                logger.debug(f"GeckoTerminal response status: {response.status_code}")
-                
-                if response.status_code != 200:
-                    logger.warning(f"GeckoTerminal: Could not fetch price for {token_address}. Status: {response.status_code}")
-                    continue
-                
-                response_data = response.json()
-                logger.debug(f"GeckoTerminal raw response: {response_data}")
-                
-                price_usd = None
-                if response_data and "data" in response_data and "attributes" in response_data["data"]:
-                    price_usd = response_data["data"]["attributes"].get("price_usd")
-                
-                if price_usd is not None and price_usd != "":
-                    price_decimal = Decimal(str(price_usd))
-                    prices[token_address] = price_decimal
-                    logger.info(f"GeckoTerminal: Price for {token_address} = {price_usd} USD")
-                else:
-                    logger.warning(f"GeckoTerminal: Price not found or invalid in response for {token_address}.")
-                    
-            except httpx.HTTPError as e:
-                logger.warning(f"GeckoTerminal: HTTP error for {token_address}: {e}")
-            except Exception as e:
-                logger.warning(f"GeckoTerminal: Error fetching price for {token_address}: {e}")
+        # Один запрос tokens/multi на пачку до 30 адресов, пачки выполняются конкурентно с ограничением
+        batches = [
+            token_addresses[i:i + GECKOTERMINAL_MULTI_BATCH_SIZE]
+            for i in range(0, len(token_addresses), GECKOTERMINAL_MULTI_BATCH_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(GECKOTERMINAL_MAX_CONCURRENCY)
+        results = await asyncio.gather(
+            *(_get_token_prices_geckoterminal_batch(batch, client, semaphore) for batch in batches)
+        )
+        prices = {}
+        for batch_prices in results:
+            prices.update(batch_prices)
         
         logger.debug(f"COMPLETED GeckoTerminal price fetch. Found prices for {len(prices)}/{len(token_addresses)} tokens")
         return prices
@@ -213,12 +332,11 @@ async def get_multiple_token_prices(token_addresses: list, blockchain: str = 'et
         if blockchain.lower() == 'solana':
             logger.info(f"Using GeckoTerminal for Solana tokens: {uncached_tokens}")
             
-            # Создаем временный клиент если не передан
+            # Используем общий клиент если не передан
             if client is None:
-                async with httpx.AsyncClient(timeout=15.0) as temp_client:
-                    gecko_prices = await get_token_prices_geckoterminal(uncached_tokens, temp_client)
-            else:
-                gecko_prices = await get_token_prices_geckoterminal(uncached_tokens, client)
+                client = get_http_client()
+            
+            gecko_prices = await get_token_prices_geckoterminal(uncached_tokens, client)
             
             # Обновляем результаты и кэш
             for token_address in uncached_tokens:
@@ -239,7 +357,6 @@ async def get_multiple_token_prices(token_addresses: list, blockchain: str = 'et
             logger.info(f"Using CoinGecko for Ethereum tokens: {uncached_tokens}")
             
             # Запрос для некэшированных токенов
-            api_key = get_coingecko_api_key()
             url = f"{COINGECKO_ENDPOINT}simple/token_price/ethereum"
             
             # CoinGecko может обработать до 100 токенов за раз
@@ -254,19 +371,14 @@ async def get_multiple_token_prices(token_addresses: list, blockchain: str = 'et
                     'vs_currencies': 'usd'
                 }
                 
-                headers = {}
-                if api_key:
-                    headers["x-cg-pro-api-key"] = api_key
-                
-                # Создаем временный клиент если не передан
+                # Используем общий клиент если не передан
                 if client is None:
-                    async with httpx.AsyncClient(timeout=15.0) as temp_client:
-                        response = await temp_client.get(url, params=params, headers=headers)
-                else:
-                    response = await client.get(url, params=params, headers=headers)
+                    client = get_http_client()
+                
+                response = await client.get(url, params=params, headers=get_coingecko_headers())
                 
                 response.raise_for_status()
-                data = response.json()
+                data = parse_json_response(response)
                 
                 for token_address in batch:
                     token_data = data.get(token_address.lower(), {})
@@ -283,10 +395,9 @@ async def get_multiple_token_prices(token_addresses: list, blockchain: str = 'et
                         results[token_address] = Decimal('0')
                         logger.warning(f"No price data for token {token_address}")
                 
-                # Небольшая задержка между батчами
+                # Небольшая задержка между батчами (не блокируя event loop)
                 if i + batch_size < len(uncached_tokens):
-                    await httpx.AsyncClient().aclose()  # Освобождаем соединения
-                    time.sleep(0.5)
+                    await asyncio.sleep(0.5)
         
         else:
             logger.error(f"Unsupported blockchain: {blockchain}")
@@ -318,8 +429,6 @@ def get_token_price(token_address: str, blockchain: str = 'ethereum') -> Decimal
     Returns:
         Decimal: Цена токена в USD
     """
-    import asyncio
-    
     try:
         loop = asyncio.get_event_loop()
         if loop.is_running():
@@ -329,13 +438,11 @@ def get_token_price(token_address: str, blockchain: str = 'ethereum') -> Decimal
             if blockchain.lower() == 'solana':
                 # Для Solana используем GeckoTerminal
                 url = f"https://api.geckoterminal.com/api/v2/networks/solana/tokens/{token_address}"
-                headers = {"Accept": "application/json"}
-                
                 with httpx.Client(timeout=10.0) as client:
-                    response = client.get(url, headers=headers)
+                    response = client.get(url, headers=GECKOTERMINAL_HEADERS)
                     
                     if response.status_code == 200:
-                        response_data = response.json()
+                        response_data = parse_json_response(response)
                         
                         price_usd = None
                         if response_data and "data" in response_data and "attributes" in response_data["data"]:
@@ -354,15 +461,10 @@ def get_token_price(token_address: str, blockchain: str = 'ethereum') -> Decimal
                     'contract_addresses': token_address.lower(),
                     'vs_currencies': 'usd'
                 }
-                headers = {}
-                api_key = get_coingecko_api_key()
-                if api_key:
-                    headers["x-cg-pro-api-key"] = api_key
-                
                 with httpx.Client(timeout=10.0) as client:
-                    response = client.get(url, params=params, headers=headers)
+                    response = client.get(url, params=params, headers=get_coingecko_headers())
                     response.raise_for_status()
-                    response_data = response.json()
+                    response_data = parse_json_response(response)
                     
                     token_data = response_data.get(token_address.lower(), {})
                     price_usd = token_data.get('usd', 0)
@@ -386,9 +488,8 @@ def get_token_price(token_address: str, blockchain: str = 'ethereum') -> Decimal
 async def get_token_price_solana_async(token_address: str) -> Decimal:
     """Асинхронное получение цены Solana токена через GeckoTerminal"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            prices = await get_token_prices_geckoterminal([token_address], client)
-            return prices.get(token_address, Decimal('0'))
+        prices = await get_token_prices_geckoterminal([token_address], get_http_client())
+        return prices.get(token_address, Decimal('0'))
     except Exception as e:
         logger.error(f"Error getting Solana token price for {token_address}: {e}")
         return Decimal('0')
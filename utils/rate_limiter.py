@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter
+Асинхронный token bucket для ограничения частоты запросов к внешним API
+"""
+
+import asyncio
+import time
+
+class AsyncTokenBucket:
+    """Token bucket: не более rate запросов в секунду в среднем, всплески до capacity"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Пополнение токенов за прошедшее время"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Ожидание свободного токена (ожидающие вызовы обслуживаются по очереди)"""
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False